@@ -6,32 +6,43 @@ Created on Fri Jul 17 2020
 
 """
 
+import os
+import time
 import numpy as np
 import pandas as pd
+from copy import deepcopy
+from collections import OrderedDict as ODict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.signal import lfilter
 from abc import ABC, abstractmethod
 
 __version__ = "1.0.0"
 __author__ = "Jack Kirby Cook"
-__all__ = ['History', 'DurationDampener', 'ErrorConverger', 'ConvergenceError', 'OscillationConverger']
+__all__ = ['History', 'RollingStatistics', 'ExponentialStatistics', 'DurationDampener', 'ErrorConverger', 'ConvergenceError', 'OscillationConverger', 'ActiveSet', 'FixedPointIteration', 'FixedPointPool']
 __copyright__ = "Copyright 2020, Jack Kirby Cook"
 __license__ = ""
 
 
 _multiply = lambda x, y: x * y
 _divide = lambda x, y: x / y
-_window = lambda x, n, i: x[i:i+n]
-_void = lambda n: np.ones(n-1) * np.NaN
+_void = lambda n: np.ones(n-1) * np.nan
 _pad = lambda x, n, f: np.concatenate([_void(n), f(x, n)])
-_error = lambda x, rtol, atol: np.allclose(x, np.zeros(x.shape), rtol=rtol, atol=atol) 
+_error = lambda x, rtol, atol: np.all(np.isclose(x, 0, rtol=rtol, atol=atol).reshape(np.shape(x)[0], -1), axis=1)
 _avgsqerr = lambda x: np.square(x).mean() ** 0.5
 _maxsqerr = lambda x: np.max(np.square(x)) ** 0.5
 _minsqerr = lambda x: np.min(np.square(x)) ** 0.5
-_delta = lambda x: x[1:] - x[:-1]
-_drt = lambda x: _delta(x) / np.abs(_delta(x))
-_sma = lambda x, n: np.convolve(x, np.ones(n)/n, 'valid')
-_mmax = lambda x, n: np.array([np.amax(_window(x, n, i)) for i in np.arange(len(x)-n+1)])
-_mmin = lambda x, n: np.array([np.amin(_window(x, n, i)) for i in np.arange(len(x)-n+1)])
-_ema = lambda x, n, s: (x[-1] * (s / (1 + n))) + (_ema(x[:-1], n, s) if len(x) > 1 else 0) * (1 - (s / (1 + n)))
+_delta = lambda x: x[..., 1:] - x[..., :-1]
+_drt = lambda x: np.sign(_delta(x))
+_cumsum = lambda x: np.cumsum(np.concatenate([np.zeros((*np.shape(x)[:-1], 1)), x], axis=-1), axis=-1)
+_rollsum = lambda c, n: c[..., n:] - c[..., :-n]
+_sma = lambda x, n: _rollsum(_cumsum(x), n) / n
+_mmax = lambda x, n: np.max(sliding_window_view(x, n, axis=-1), axis=-1)
+_mmin = lambda x, n: np.min(sliding_window_view(x, n, axis=-1), axis=-1)
+_alpha = lambda n, s: s / (1 + n)
+_problem = lambda problem: problem if isinstance(problem, tuple) else (problem, {})
+_ema = lambda x, n, s, y=None: lfilter([_alpha(n, s)], [1, _alpha(n, s) - 1], x, axis=-1, zi=(1 - _alpha(n, s)) * (x[..., :1] if y is None else y))[0]
+_emv = lambda x, n, s: lfilter([_alpha(n, s) * (1 - _alpha(n, s))], [1, _alpha(n, s) - 1], np.square(x - np.concatenate([x[..., :1], _ema(x, n, s)[..., :-1]], axis=-1)), axis=-1)
 
 
 class Dampener(ABC):
@@ -54,13 +65,15 @@ class DurationDampener(Dampener):
 class ConvergenceError(Exception): pass
 class Converger(ABC): 
     @abstractmethod
-    def converged(self): pass
+    def mask(self): pass
     @abstractmethod
     def limit(self): pass
+    def converged(self): return bool(np.all(self.mask())) if self.active else False
+    def select(self, rows): pass
                 
     def __bool__(self): return self.converged() if self.active else False
     def __len__(self): return self.values.shape[-1] if self.active else 0
-    def __call__(self, errors, values): self.errors, self.values = errors, values     
+    def __call__(self, errors, values, rolling=None): self.errors, self.values, self.rolling = errors, values, rolling
 
     @property
     def active(self): return hasattr(self, 'values') and hasattr(self, 'errors')
@@ -72,70 +85,410 @@ class Converger(ABC):
 class ErrorConverger(Converger): 
     def __init__(self, *args, rtol, atol, **kwargs): self.__rtol, self.__atol = rtol, atol
     def limit(self): return self.values[:, -1]
-    def converged(self): 
-        if not self.active: return False
+    def mask(self): 
+        if not self.active: return np.zeros(0, dtype=bool)
         else: return _error(self.errors, self.__rtol, self.__atol)
 
 class OscillationConverger(Converger):
-    def __init__(self, *args, period, btol, ttol, otol, **kwargs): 
+    def __init__(self, *args, period, btol, ttol, otol, smoothing=None, **kwargs): 
+        assert smoothing in (None, 'ema')
         self.__period, self.__btol, self.__ttol, self.__otol = period, btol, ttol, otol
+        self.__smoothing = smoothing
     
-    def limit(self): return np.average(np.apply_along_axis(_sma, 1, self.values[:, -self.__period:], self.__period), axis=1)
-    def converged(self): 
-        if not self.active or len(self) <= self.__period: return False
-        return all([self.__bounded(), self.__oscillating(), not self.__trending()])  
-
-    def __bounded(self):
-        xmax = np.apply_along_axis(np.max, 1, self.values[:, -self.__period:])
-        xmin = np.apply_along_axis(np.min, 1, self.values[:, -self.__period:])
-        return np.all(np.maximum((xmax - xmin) - self.__btol, 0) == 0)
-
-    def __trending(self): 
-        deltas = np.apply_along_axis(_delta, 1, self.values[:, -self.__period:])
-        trends = np.sum(deltas, axis=1) / (self.__period - 1)
-        return np.all(np.maximum(trends - self.__ttol, 0) != 0)
-
-    def __oscillating(self): 
-        drts = np.apply_along_axis(_drt, 1, self.values[:, -self.__period:])
+    def __call__(self, errors, values, rolling=None):
+        columns = np.shape(values)[-1]
+        if self.__smoothing == 'ema' and self.__continues(values): 
+            smoothed = _ema(values[:, -1:], self.__period, 2, self.__smoothed[:, -1:])
+            self.__smoothed = np.concatenate([self.__smoothed, smoothed], axis=1)[:, -self.__period:]
+        elif self.__smoothing == 'ema': self.__smoothed = _ema(values, self.__period, 2)[:, -self.__period:]
+        self.__columns = columns
+        super().__call__(errors, values, rolling=rolling)
+
+    def select(self, rows): 
+        if self.__smoothing == 'ema' and self.active: self.__smoothed = self.__smoothed[rows]
+
+    def limit(self): 
+        if self.__smoothing == 'ema': return self.__smoothed[:, -1]
+        if self.__incremental(): return self.rolling.mean
+        return np.average(self.__window(), axis=1)
+
+    def mask(self): 
+        if not self.active: return np.zeros(0, dtype=bool)
+        if len(self) <= self.__period: return np.zeros(self.values.shape[0], dtype=bool)
+        window = self.__window()
+        return self.__bounded(window) & self.__oscillating(window) & ~self.__trending(window)
+
+    def __incremental(self): 
+        rolling = getattr(self, 'rolling', None)
+        return self.__smoothing is None and rolling is not None and rolling.period == self.__period and rolling.ready
+
+    def __continues(self, values):
+        if not self.active or not self.__smoothed.shape[-1]: return False
+        return self.__smoothed.shape[0] == np.shape(values)[0] and np.shape(values)[-1] in (self.__columns, self.__columns + 1)
+
+    def __window(self): 
+        if self.__smoothing == 'ema': return self.__smoothed
+        return self.values[:, -self.__period:]
+
+    def __bounded(self, window):
+        if self.__incremental(): xmax, xmin = self.rolling.maximum, self.rolling.minimum
+        else: xmax, xmin = np.max(window, axis=1), np.min(window, axis=1)
+        return np.maximum((xmax - xmin) - self.__btol, 0) == 0
+
+    def __trending(self, window): 
+        trends = (window[:, -1] - window[:, 0]) / (self.__period - 1)
+        return np.maximum(trends - self.__ttol, 0) != 0
+
+    def __oscillating(self, window): 
+        drts = _drt(window)
         oscillates = np.abs(np.sum(drts, axis=1)) / (self.__period - 1)
-        return np.all(np.maximum(oscillates - self.__otol, 0) == 0)
+        return np.maximum(oscillates - self.__otol, 0) == 0
         
     
+class ActiveSet(object):
+    def __init__(self, size): 
+        self.__indexes = np.arange(size)
+        self.__converged = np.zeros(size, dtype=bool)
+        self.__limits = np.full(size, np.nan)
+
+    @property
+    def indexes(self): return self.__indexes
+    @property
+    def converged(self): return self.__converged
+    @property
+    def limits(self): return self.__limits
+
+    def __repr__(self): return '{}(active={}, converged={})'.format(self.__class__.__name__, len(self), int(np.sum(self.__converged)))
+    def __len__(self): return len(self.__indexes)
+    def __bool__(self): return len(self) > 0
+    def __call__(self, converger): return self.update(converger.mask(), converger.limit())
+
+    def update(self, mask, limits):
+        mask = np.asarray(mask, dtype=bool)
+        assert mask.shape == self.__indexes.shape
+        rows = self.__indexes[mask]
+        self.__converged[rows], self.__limits[rows] = True, np.asarray(limits)[mask]
+        self.__indexes = self.__indexes[~mask]
+        return ~mask
+
+    def expand(self, values):
+        values = np.asarray(values)
+        expanded = np.full((len(self.__limits), *values.shape[1:]), np.nan)
+        expanded[self.__converged] = np.expand_dims(self.__limits[self.__converged], axis=tuple(range(1, values.ndim)))
+        expanded[self.__indexes] = values
+        return expanded
+
+
+class RollingStatistics(object):
+    def __init__(self, *args, period, **kwargs):
+        assert isinstance(period, int) and period > 0
+        self.__period, self.__count = period, 0
+    
+    @property
+    def period(self): return self.__period
+    @property
+    def ready(self): return self.__count >= self.__period
+    @property
+    def mean(self): return self.__mean if self.ready else self.__void()
+    @property
+    def variance(self): return np.maximum(self.__m2, 0) / (self.__period - 1) if self.ready and self.__period > 1 else self.__void()
+    @property
+    def stdev(self): return np.sqrt(self.variance)
+    @property
+    def maximum(self): return self.__maximum if self.ready else self.__void()
+    @property
+    def minimum(self): return self.__minimum if self.ready else self.__void()
+    
+    def __void(self): return np.full(self.__mean.shape, np.nan) if self.__count else np.empty(0)
+    def select(self, rows):
+        if not self.__count: return
+        for attr in ('mean', 'm2', 'current', 'previous', 'suffixmax', 'suffixmin', 'prefixmax', 'prefixmin', 'maximum', 'minimum'):
+            setattr(self, '_RollingStatistics__' + attr, getattr(self, '_RollingStatistics__' + attr)[rows])
+    def __len__(self): return min(self.__count, self.__period)
+    def __call__(self, data):
+        data, n, i = np.asarray(data, dtype=np.float64), self.__period, self.__count % self.__period
+        if not self.__count: 
+            self.__mean, self.__m2 = np.zeros(data.shape), np.zeros(data.shape)
+            self.__current, self.__previous = np.empty((*data.shape, n)), np.empty((*data.shape, n))
+            self.__suffixmax, self.__suffixmin = np.empty((*data.shape, n)), np.empty((*data.shape, n))
+        if self.__count < n:
+            delta = data - self.__mean
+            self.__mean = self.__mean + delta / (self.__count + 1)
+            self.__m2 = self.__m2 + delta * (data - self.__mean)
+        else:
+            previous, mean = self.__previous[..., i], self.__mean
+            self.__mean = mean + (data - previous) / n
+            self.__m2 = self.__m2 + (data - previous) * (data - self.__mean + previous - mean)
+        self.__current[..., i] = data
+        self.__prefixmax = data if i == 0 else np.maximum(self.__prefixmax, data)
+        self.__prefixmin = data if i == 0 else np.minimum(self.__prefixmin, data)
+        self.__maximum = self.__prefixmax if i == n - 1 else np.maximum(self.__suffixmax[..., i + 1], self.__prefixmax)
+        self.__minimum = self.__prefixmin if i == n - 1 else np.minimum(self.__suffixmin[..., i + 1], self.__prefixmin)
+        if i == n - 1:
+            self.__suffixmax = np.flip(np.maximum.accumulate(np.flip(self.__current, axis=-1), axis=-1), axis=-1)
+            self.__suffixmin = np.flip(np.minimum.accumulate(np.flip(self.__current, axis=-1), axis=-1), axis=-1)
+            self.__current, self.__previous = self.__previous, self.__current
+        self.__count += 1
+
+
+class ExponentialStatistics(object):
+    def __init__(self, *args, period, smoothing=2, **kwargs):
+        assert isinstance(period, int) and period > 0
+        assert 0 < _alpha(period, smoothing) <= 1
+        self.__period, self.__smoothing, self.__count = period, smoothing, 0
+
+    @property
+    def period(self): return self.__period
+    @property
+    def smoothing(self): return self.__smoothing
+    @property
+    def mean(self): return self.__mean if self.__count else np.empty(0)
+    @property
+    def variance(self): return self.__variance if self.__count else np.empty(0)
+    @property
+    def stdev(self): return np.sqrt(self.variance)
+
+    def __len__(self): return self.__count
+    def select(self, rows):
+        if self.__count: self.__mean, self.__variance = self.__mean[rows], self.__variance[rows]
+
+    def __call__(self, data):
+        data, alpha = np.asarray(data, dtype=np.float64), _alpha(self.__period, self.__smoothing)
+        if not self.__count: self.__mean, self.__variance = data.copy(), np.zeros(data.shape)
+        else: 
+            delta = data - self.__mean
+            self.__mean = self.__mean + alpha * delta
+            self.__variance = (1 - alpha) * (self.__variance + alpha * np.square(delta))
+        self.__count += 1
+
+
 class History(object):
+    def __init__(self, *args, capacity=None, size=64, period=None, span=None, smoothing=2, file=None, **kwargs):
+        assert capacity is None or (isinstance(capacity, int) and capacity > 0)
+        assert isinstance(size, int) and size > 0
+        assert file is None or capacity is None
+        self.__capacity, self.__size, self.__file = capacity, size, file
+        self.__buffer, self.__count = None, 0
+        self.__rolling = RollingStatistics(period=period) if period is not None else None
+        self.__exponential = ExponentialStatistics(period=span, smoothing=smoothing) if span is not None else None
+
+    @property
+    def capacity(self): return self.__capacity
+    @property
+    def rolling(self): return self.__rolling
+    @property
+    def exponential(self): return self.__exponential
+    @property
+    def iterations(self): return self.__count
     @property
-    def data(self): return self.__data
-    def sma(self, period=1): return np.apply_along_axis(_sma, 1, self.__data) if len(self) >= period else _void(len(self))
-    def mmax(self, period=1): return np.apply_along_axis(_mmax, 1, self.__data) if len(self) >= period else _void(len(self))
-    def mmin(self, period=1): return np.apply_along_axis(_mmin, 1, self.__data) if len(self) >= period else _void(len(self))
+    def file(self): return self.__file
+    @property
+    def data(self): 
+        if self.__buffer is None: return np.empty((0, 0))
+        if self.__file is not None: return self.__buffer[:self.__count].T
+        if self.__capacity is None or self.__count < self.__capacity: return self.__buffer[:, :self.__count]
+        start = self.__count % self.__capacity
+        return self.__buffer[:, start:start + self.__capacity]
+
+    def sma(self, period=1): return _sma(self.data, period) if len(self) >= period else _void(len(self))
+    def mmax(self, period=1): return _mmax(self.data, period) if len(self) >= period else _void(len(self))
+    def mmin(self, period=1): return _mmin(self.data, period) if len(self) >= period else _void(len(self))
+    def ema(self, period=1, smoothing=2): return _ema(self.data, period, smoothing)
+    def emv(self, period=1, smoothing=2): return _emv(self.data, period, smoothing)
   
-    def __len__(self): return len(self.__data) if self else 0
-    def __bool__(self): return hasattr(self, '__data')
+    def __len__(self): return min(self.__count, self.__capacity) if self.__capacity is not None else self.__count
+    def __bool__(self): return self.__count > 0
+    def select(self, rows):
+        assert self.__file is None
+        if self.__buffer is not None: self.__buffer = self.__buffer[rows]
+        if self.__rolling is not None: self.__rolling.select(rows)
+        if self.__exponential is not None: self.__exponential.select(rows)
     def __call__(self, data):
-        try: self.__data = np.append(self.__data, np.expand_dims(data, axis=1), axis=1)
-        except AttributeError: self.__data = np.expand_dims(data, axis=1)     
+        assert self.__buffer is None or self.__buffer.flags.writeable, 'History is closed or read-only'
+        data = np.asarray(data, dtype=np.float64)
+        if self.__buffer is None and self.__file is not None: 
+            self.__buffer = np.lib.format.open_memmap(self.__file, mode='w+', dtype=np.float64, shape=(self.__size, data.shape[0]))
+            self.flush()
+        if self.__buffer is None: self.__buffer = np.empty((data.shape[0], 2 * self.__capacity if self.__capacity is not None else self.__size))
+        if self.__file is not None:
+            if self.__count == self.__buffer.shape[0]: self.__grow()
+            self.__buffer[self.__count] = data
+        elif self.__capacity is not None:
+            index = self.__count % self.__capacity
+            self.__buffer[:, index], self.__buffer[:, index + self.__capacity] = data, data
+        else:
+            if self.__count == self.__buffer.shape[1]: 
+                buffer = np.empty((self.__buffer.shape[0], 2 * self.__buffer.shape[1]))
+                buffer[:, :self.__count] = self.__buffer
+                self.__buffer = buffer
+            self.__buffer[:, self.__count] = data
+        if self.__rolling is not None: self.__rolling(data)
+        if self.__exponential is not None: self.__exponential(data)
+        self.__count += 1
+        if self.__file is not None: self.__header()
+
+    @classmethod
+    def load(cls, file, *args, mode='r', **kwargs):
+        assert mode in ('r', 'r+')
+        buffer = np.load(file, mmap_mode=mode)
+        assert buffer.ndim == 2
+        history = cls(*args, file=file, **kwargs)
+        history.__buffer, history.__count = buffer, buffer.shape[0]
+        for data in buffer:
+            if history.__rolling is not None: history.__rolling(np.asarray(data))
+            if history.__exponential is not None: history.__exponential(np.asarray(data))
+        return history
+
+    def flush(self):
+        if self.__file is None or self.__buffer is None or not self.__buffer.flags.writeable: return
+        self.__buffer.flush()
+        self.__header()
+
+    def close(self):
+        self.flush()
+        if self.__file is not None: self.__buffer = np.load(self.__file, mmap_mode='r')
+
+    def __header(self):
+        with open(self.__file, 'r+b') as file: 
+            version = np.lib.format.read_magic(file)
+            file.seek(0)
+            header = dict(descr=np.lib.format.dtype_to_descr(self.__buffer.dtype), fortran_order=False, shape=(self.__count, self.__buffer.shape[1]))
+            {(1, 0):np.lib.format.write_array_header_1_0, (2, 0):np.lib.format.write_array_header_2_0}[version](file, header)
+
+    def __offset(self):
+        with open(self.__file, 'rb') as file:
+            version = np.lib.format.read_magic(file)
+            {(1, 0):np.lib.format.read_array_header_1_0, (2, 0):np.lib.format.read_array_header_2_0}[version](file)
+            return file.tell()
+
+    def __open(self, rows):
+        offset, series = self.__offset(), self.__buffer.shape[1]
+        with open(self.__file, 'r+b') as file: file.truncate(max(os.path.getsize(self.__file), offset + rows * series * self.__buffer.itemsize))
+        return np.memmap(self.__file, dtype=self.__buffer.dtype, mode='r+', offset=offset, shape=(rows, series))
+
+    def __grow(self):
+        rows = 2 * self.__buffer.shape[0]
+        self.__buffer.flush()
+        self.__buffer = self.__open(rows)
+        self.flush()
 
     def __getitem__(self, index):
         def wrapper(period=1):
             assert isinstance(period, int) and period >= 1
             columns = ['DATA', 'SMA{}'.format(period), 'MAX{}'.format(period), 'MIN{}'.format(period)]
-            data = np.array([self.__data[index, :], _pad(self.__data[index, :], period, _sma), _pad(self.__data[index, :], period, _mmax), _pad(self.__data[index, :], period, _mmin)])
+            data = np.array([self.data[index, :], _pad(self.data[index, :], period, _sma), _pad(self.data[index, :], period, _mmax), _pad(self.data[index, :], period, _mmin)])
             dataframe = pd.DataFrame(data.transpose(), columns=columns)
             return dataframe
         return wrapper
 
     def table(self, period=1):
         assert isinstance(period, int) and period >= 1
-        dataframe = pd.DataFrame(self.__data.transpose())
+        dataframe = pd.DataFrame(self.data.transpose())
         if period > 0: dataframe = dataframe.rolling(window=period).mean().dropna(axis=1, how='all')
         return dataframe
-    
-    
-    
-    
-    
-    
-    
-    
-    
-    
-    
\ No newline at end of file
+
+
+class FixedPointIteration(object):
+    def __init__(self, function, *args, converger, dampener=None, acceleration=None, depth=5, iterations=1000, shrink=False, **kwargs):
+        assert isinstance(converger, Converger) and (dampener is None or isinstance(dampener, Dampener))
+        assert acceleration in (None, 'anderson', 'aitken')
+        assert isinstance(depth, int) and depth > 0 and isinstance(iterations, int) and iterations > 0
+        self.__function, self.__converger, self.__dampener = function, converger, dampener
+        self.__acceleration, self.__depth, self.__iterations, self.__shrink = acceleration, depth, iterations, shrink
+        self.__timings, self.__statistics = np.empty(0), pd.DataFrame(columns=['limit', 'converged', 'iterations', 'residual'])
+
+    @property
+    def timings(self): return self.__timings
+    @property
+    def statistics(self): return self.__statistics
+
+    def __repr__(self): return '{}(converger={}, acceleration={}, iterations={})'.format(self.__class__.__name__, self.__converger.__class__.__name__, self.__acceleration, self.__iterations)
+    def __call__(self, x, *args, history=None, **kwargs):
+        x = np.array(x, dtype=np.float64)
+        history = history if history is not None else History()
+        active, memory, timings = ActiveSet(len(x)), [], []
+        steps, residuals = np.full(len(x), -1), np.full(len(x), np.nan)
+        history(x)
+        for iteration in range(1, self.__iterations + 1):
+            start = time.perf_counter()
+            indexes = active.indexes
+            updates = dict(indexes=indexes) if self.__shrink else {}
+            f = np.asarray(self.__function(x, *args, **updates, **kwargs), dtype=np.float64) - x
+            factors = self.__dampener(history.data) if self.__dampener is not None else np.ones(len(x))
+            memory = [*memory, (x, f)][-(self.__depth + 1):]
+            if self.__acceleration == 'anderson': x = self.__anderson(memory, factors)
+            elif self.__acceleration == 'aitken' and iteration % 3 == 0: x = self.__aitken(history.data, x + factors * f)
+            else: x = x + factors * f
+            history(x)
+            self.__converger(f, history.data, rolling=history.rolling)
+            mask = self.__converger.mask()
+            residuals[indexes] = np.abs(f)
+            steps[indexes[mask & (steps[indexes] < 0)]] = iteration
+            timings.append(time.perf_counter() - start)
+            if self.__shrink:
+                keep = active.update(mask, self.__converger.limit())
+                x, memory = x[keep], [(mx[keep], mf[keep]) for mx, mf in memory]
+                history.select(keep)
+                self.__converger.select(keep)
+                if not active: break
+            elif np.all(mask): break
+        limits = active.expand(x) if self.__shrink else self.__converger.limit()
+        self.__timings = np.array(timings)
+        self.__statistics = pd.DataFrame({'limit':limits, 'converged':steps >= 0, 'iterations':np.where(steps >= 0, steps, np.nan), 'residual':residuals})
+        return limits
+
+    @staticmethod
+    def __anderson(memory, factors):
+        x, f = memory[-1]
+        if len(memory) < 2: return x + factors * f
+        dx = np.stack([memory[i+1][0] - memory[i][0] for i in range(len(memory) - 1)], axis=-1)
+        df = np.stack([memory[i+1][1] - memory[i][1] for i in range(len(memory) - 1)], axis=-1)
+        gamma = np.linalg.lstsq(df, f, rcond=None)[0]
+        accelerated = x + factors * f - (dx + np.expand_dims(factors, axis=-1) * df) @ gamma
+        return accelerated if np.all(np.isfinite(accelerated)) else x + factors * f
+
+    @staticmethod
+    def __aitken(data, x):
+        if data.shape[-1] < 2: return x
+        x0, x1 = data[:, -2], data[:, -1]
+        d0, d1 = x1 - x0, x - x1
+        with np.errstate(all='ignore'): accelerated = x - np.square(d1) / (d1 - d0)
+        return np.where(np.isfinite(accelerated) & (np.abs(d1 - d0) > np.finfo(np.float64).eps * np.maximum(np.abs(x), 1)), accelerated, x)
+
+
+def _fixedpoints(iteration, problems):
+    results = []
+    for key, (x, kwargs) in problems:
+        solver = deepcopy(iteration)
+        limits = solver(x, **kwargs)
+        results.append((key, limits, solver.statistics, solver.timings))
+    return results
+
+
+class FixedPointPool(object):
+    def __init__(self, iteration, *args, executor='process', workers=None, chunksize=None, **kwargs):
+        assert isinstance(iteration, FixedPointIteration)
+        assert executor in ('process', 'thread')
+        self.__iteration, self.__executor, self.__workers, self.__chunksize = iteration, executor, workers, chunksize
+        self.__statistics, self.__timings = pd.DataFrame(), ODict()
+
+    @property
+    def statistics(self): return self.__statistics
+    @property
+    def timings(self): return self.__timings
+
+    def __repr__(self): return '{}(iteration={}, executor={}, workers={})'.format(self.__class__.__name__, repr(self.__iteration), self.__executor, self.__workers)
+    def __call__(self, problems):
+        assert isinstance(problems, dict)
+        problems = [(key, _problem(problem)) for key, problem in problems.items()]
+        executor = {'process':ProcessPoolExecutor, 'thread':ThreadPoolExecutor}[self.__executor]
+        workers = self.__workers if self.__workers is not None else (os.cpu_count() or 1)
+        chunksize = self.__chunksize if self.__chunksize is not None else max(1, -(-len(problems) // (4 * workers)))
+        chunks = [problems[i:i+chunksize] for i in range(0, len(problems), chunksize)]
+        with executor(max_workers=workers) as pool:
+            results = [result for results in pool.map(_fixedpoints, [self.__iteration] * len(chunks), chunks) for result in results]
+        limits = ODict([(key, limit) for key, limit, statistics, timings in results])
+        self.__timings = ODict([(key, timings) for key, limit, statistics, timings in results])
+        self.__statistics = pd.concat({key:statistics for key, limit, statistics, timings in results}, names=['problem', 'series']) if results else pd.DataFrame()
+        return limits
+
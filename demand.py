@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 2026
+@name:   Demand Objects
+@author: Jack Kirby Cook
+
+"""
+
+import numpy as np
+
+from utilities.utility import UtilityFunction, NumericalError
+
+__version__ = "1.0.0"
+__author__ = "Jack Kirby Cook"
+__all__ = ['DemandSolver']
+__copyright__ = "Copyright 2020, Jack Kirby Cook"
+__license__ = ""
+
+
+_expand = lambda x: np.expand_dims(x, axis=-1)
+_onehot = lambda k, n: np.equal(_expand(k), np.arange(n)).astype(np.float64)
+_corner = lambda m, p, w: _onehot(np.argmax(np.divide(w, p), axis=-1), np.shape(p)[-1]) * np.divide(_expand(m), p)
+_elasticity = lambda r: 1 / (1 - r)
+
+
+MARSHALLIAN_DEMANDS = {
+    'cobbdouglas': lambda m, p, w, *args: np.divide(_expand(m) * w, p),
+    'ces': lambda m, p, w, a, d, r, *args: _expand(m) * np.divide(np.power(np.divide(w, p), _elasticity(r)), _expand(np.sum(np.power(w, _elasticity(r)) * np.power(p, 1 - _elasticity(r)), axis=-1))),
+    'linear': lambda m, p, w, *args: _corner(m, p, w),
+    'expcobbdouglas': lambda m, p, w, *args: _corner(m, p, w)}
+
+
+class DemandSolver(object):
+    def __init__(self, function, *args, method=None, tol=1e-10, iterations=100, backtracks=30, **kwargs):
+        assert isinstance(function, UtilityFunction)
+        assert method in (None, 'closed', 'newton')
+        closed = not function.functions and function.functiontype in MARSHALLIAN_DEMANDS.keys()
+        assert method != 'closed' or closed
+        graph = function.graph()
+        self.__function, self.__graph = function, graph
+        self.__method = method if method is not None else ('closed' if closed else 'newton')
+        self.__subsistences = np.array([graph.nodes[key].compile().subsistences[graph.nodes[key].parameters.index(parm)] for key, parm in graph.leaves])
+        self.__tol, self.__iterations, self.__backtracks = tol, iterations, backtracks
+
+    @property
+    def goods(self): return self.__graph.leaves
+    @property
+    def method(self): return self.__method
+
+    def __repr__(self): return '{}(function={}, method={}, goods={})'.format(self.__class__.__name__, self.__function.name, self.__method, len(self))
+    def __len__(self): return len(self.goods)
+    def __call__(self, prices, income, errors='ignore'):
+        assert errors in ('raise', 'ignore', 'mask')
+        prices, income = np.asarray(prices, dtype=np.float64), np.asarray(income, dtype=np.float64)
+        assert prices.shape[-1] == len(self)
+        prices, income = np.broadcast_to(prices, (*np.broadcast_shapes(prices.shape[:-1], income.shape), len(self))), np.broadcast_to(income, np.broadcast_shapes(prices.shape[:-1], income.shape))
+        residual = income - np.sum(prices * self.__subsistences, axis=-1)
+        if self.__method == 'closed': x, mask = self.__closed(prices, residual)
+        else: x, mask = self.__newton(prices.reshape(-1, len(self)), income.reshape(-1), residual.reshape(-1))
+        x, mask = x.reshape(prices.shape), mask.reshape(income.shape)
+        if errors == 'mask': return x, mask
+        if errors == 'raise' and not np.all(mask): raise NumericalError(np.argwhere(np.logical_not(mask)))
+        return x
+
+    def __closed(self, prices, residual):
+        specification = self.__function.compile()
+        with np.errstate(all='ignore'):
+            z = MARSHALLIAN_DEMANDS[specification.functiontype](residual, prices, specification.weights, *specification.coefficents)
+        mask = np.logical_and(residual > 0, np.all(np.isfinite(z), axis=-1))
+        return np.where(_expand(mask), z + self.__subsistences, np.nan), mask
+
+    def __newton(self, prices, income, residual):
+        n, s, graph = len(self), self.__subsistences, self.__graph
+        x = s + np.divide(_expand(residual), n * prices)
+        multipliers = np.full(income.shape, np.nan)
+        active, mask = residual > 0, np.zeros(income.shape, dtype=bool)
+        for iteration in range(self.__iterations + 1):
+            rows = np.flatnonzero(active)
+            if not len(rows): break
+            values = graph.evaluate(x[rows], errors='ignore')
+            feasible = np.isfinite(values[graph.root.key][1])
+            active[rows[~feasible]] = False
+            rows, values = rows[feasible], {key:(inputs[feasible], u[feasible]) for key, (inputs, u) in values.items()}
+            u, du, ddu = graph.differentiate(values, order=2)
+            xa, pa, ma = x[rows], prices[rows], income[rows]
+            la = np.where(np.isnan(multipliers[rows]), np.mean(np.divide(du, pa), axis=-1), multipliers[rows])
+            stationarity, budget = du - _expand(la) * pa, ma - np.sum(pa * xa, axis=-1)
+            converged = np.max(np.abs(stationarity), axis=-1) <= self.__tol * np.maximum(np.max(np.abs(du), axis=-1), 1)
+            converged = np.logical_and(converged, np.abs(budget) <= self.__tol * np.maximum(np.abs(ma), 1))
+            active[rows[converged]], mask[rows[converged]] = False, True
+            if iteration == self.__iterations: break
+            rows, xa, pa, la, ddu = rows[~converged], xa[~converged], pa[~converged], la[~converged], ddu[~converged]
+            kkt = np.zeros((len(rows), n + 1, n + 1))
+            kkt[:, :n, :n], kkt[:, :n, n], kkt[:, n, :n] = ddu, -pa, pa
+            rhs = np.concatenate([-stationarity[~converged], _expand(budget[~converged])], axis=-1)
+            with np.errstate(all='ignore'):
+                try: steps = np.linalg.solve(kkt, _expand(rhs))[..., 0]
+                except np.linalg.LinAlgError: steps = np.einsum('...ij,...j->...i', np.linalg.pinv(kkt), rhs)
+                dx, dl = steps[:, :n], steps[:, n]
+                boundary = np.where(dx < 0, np.divide(s - xa, dx), np.inf)
+            alpha = np.where(np.all(np.isfinite(steps), axis=-1), np.minimum(1, 0.95 * np.min(boundary, axis=-1)), np.nan)
+            trial = lambda alpha: np.isfinite(graph.evaluate(xa + _expand(alpha) * dx, errors='ignore')[graph.root.key][1])
+            feasible = trial(alpha)
+            for backtrack in range(self.__backtracks):
+                if np.all(np.logical_or(feasible, np.isnan(alpha))): break
+                alpha = np.where(feasible, alpha, alpha / 2)
+                feasible = trial(alpha)
+            feasible = np.logical_and(feasible, np.isfinite(alpha))
+            active[rows[~feasible]] = False
+            x[rows[feasible]] = xa[feasible] + _expand(alpha[feasible]) * dx[feasible]
+            multipliers[rows[feasible]] = la[feasible] + alpha[feasible] * dl[feasible]
+        return np.where(_expand(mask), x, np.nan), mask
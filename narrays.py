@@ -21,11 +21,11 @@ __license__ = ""
 _replace = lambda items, index, replacement: [replacement if i == index else item for i, item in enumerate(items)]
 _bins = lambda x, grps: np.digitize(x, grps)
 _histogram = lambda x: np.unique(x, return_counts=True)
-_mask = lambda x: np.ma.masked_array(x, np.isnan(x))
 _normalize = lambda x: x / np.nansum(x)
 _minmax = lambda x: (x - np.nanmin(x)) / (np.nanmax(x) - np.nanmin(x))
 _summation = lambda x: np.nansum(x) 
-_average = lambda x, w: np.ma.average(_mask(x), weights=w).filled(np.nan)
+_expand = lambda x: np.expand_dims(x, axis=-1)
+_block = lambda ndim, index, start, stop: tuple([slice(start, stop) if i == index else slice(None) for i in range(ndim)])
 
 #SUPPORT
 @keyword_dispatcher('fill')
@@ -43,11 +43,34 @@ def _bounds(*args, direction, bounds, **kwargs):
 
 def _curve(x, y, *args, how, **kwargs):  
     return interp1d(x, y, kind=how, **_fillcurve(*args, **kwargs))
+
+def _brackets(x, values, *args, fill_value=np.nan, bounds_error=True, **kwargs):
+    order = np.argsort(x, axis=-1)
+    x = np.take_along_axis(x, order, axis=-1)
+    positions = np.sum(x[..., np.newaxis, :] < values[:, np.newaxis], axis=-1)
+    below, above = np.logical_and(positions == 0, values < x[..., :1]), positions == x.shape[-1]
+    if bounds_error and (np.any(below) or np.any(above)): raise ValueError('values outside of interpolation range')
+    lower = np.clip(positions - 1, 0, x.shape[-1] - 2)
+    xlower, xupper = np.take_along_axis(x, lower, axis=-1), np.take_along_axis(x, lower + 1, axis=-1)
+    weights = np.divide(values - xlower, xupper - xlower)
+    indexes = np.stack([np.take_along_axis(order, lower, axis=-1), np.take_along_axis(order, lower + 1, axis=-1)], axis=-1)
+    weights = np.stack([1 - weights, weights], axis=-1)
+    if isinstance(fill_value, str): return indexes, weights, np.zeros(weights.shape[:-1])
+    lowerfill, upperfill = fill_value if isinstance(fill_value, tuple) else (fill_value, fill_value)
+    outside = _expand(np.logical_or(below, above))
+    offsets = np.where(below, lowerfill, 0) + np.where(above, upperfill, 0)
+    return indexes, np.where(outside, 0, weights), np.where(outside[..., 0], offsets, 0)
     
-def _wtaverage(x, w):    
-    assert isinstance(x, np.ndarray) and isinstance(w, np.ndarray) and len(x) == len(w)
-    if all([np.isnan(i) for i in x]): return np.nan    
-    else: return _average(x, w)
+def _prefixdifference(x, period):
+    cumulative = np.cumsum(np.concatenate([np.zeros(x.shape[:-1] + (1,), dtype=x.dtype), x], axis=-1), axis=-1)
+    return cumulative[..., period:] - cumulative[..., :-period]
+
+def _blockextrema(ufunc, x, period, fill):
+    size, blocks = x.shape[-1], -(-x.shape[-1] // period)
+    x = np.concatenate([x, np.full(x.shape[:-1] + (blocks * period - size,), fill)], axis=-1).reshape(x.shape[:-1] + (blocks, period))
+    prefix = ufunc.accumulate(x, axis=-1).reshape(x.shape[:-2] + (-1,))
+    suffix = np.flip(ufunc.accumulate(np.flip(x, axis=-1), axis=-1), axis=-1).reshape(x.shape[:-2] + (-1,))
+    return ufunc(suffix[..., :size - period + 1], prefix[..., period - 1:size])
 
 def _distribution(size, values, function):
     groups = {key:value for key, value in zip(*_histogram(_bins(function(size), values)))}
@@ -55,19 +78,88 @@ def _distribution(size, values, function):
 
 
 # BROADCASTING
-def inversion(narray, header, values, *args, index, **kwargs):
-    function = lambda x: _curve(x, header, *args, **kwargs)(values)
-    return np.apply_along_axis(function, index, narray)    
-
-def interpolation(narray, header, values, *args, index, **kwargs):
-    assert all([header[0] == item for item in header])
-    function = lambda y: _curve(header, y, *args, **kwargs)(values)
-    return np.apply_along_axis(function, index, narray)
+class InterpolationPlan(object):
+    def __init__(self, header, values, *args, how, fill_value=np.nan, bounds_error=True, **kwargs):
+        header, values = np.asarray(header), np.atleast_1d(np.asarray(values, dtype=np.float64))
+        assert header.ndim == 1 and len(set(header)) == len(header)
+        curve = lambda y: interp1d(header, y, kind=how, fill_value=fill_value, bounds_error=bounds_error)(values)
+        offsets = curve(np.zeros(len(header)))
+        weights = np.transpose(curve(np.eye(len(header)))) - _expand(offsets)
+        nonzero = np.logical_and(weights != 0, ~np.isnan(weights))
+        weights = np.where(nonzero, weights, 0)
+        indexes = np.argsort(~nonzero, axis=-1, kind='stable')[:, :max(np.max(np.sum(nonzero, axis=-1)), 1)]
+        weights, indexes = np.take_along_axis(weights, indexes, axis=-1), np.where(np.take_along_axis(nonzero, indexes, axis=-1), indexes, indexes[:, :1])
+        self.__indexes, self.__weights, self.__offsets = indexes, weights, offsets
+        self.__header, self.__values, self.__how = header, values, how
+
+    def __repr__(self): return '{}(how={}, header={}, values={})'.format(self.__class__.__name__, self.__how, len(self.__header), len(self.__values))
+    def __len__(self): return len(self.__values)
+    def __call__(self, narray, *args, index=-1, **kwargs):
+        assert narray.shape[index] == len(self.__header)
+        y = np.moveaxis(narray, index, -1)
+        y = np.einsum('...mk,mk->...m', y[..., self.__indexes], self.__weights) + self.__offsets
+        return np.moveaxis(y, -1, index)
+
+    @property
+    def header(self): return self.__header
+    @property
+    def values(self): return self.__values
+    @property
+    def how(self): return self.__how
+    @property
+    def indexes(self): return self.__indexes
+    @property
+    def weights(self): return self.__weights
+    @property
+    def offsets(self): return self.__offsets
+
+
+def inversion(narray, header, values, *args, index, how, **kwargs):
+    if how != 'linear':
+        function = lambda x: _curve(x, header, *args, how=how, **kwargs)(values)
+        return np.apply_along_axis(function, index, narray)    
+    x = np.moveaxis(np.asarray(narray, dtype=np.float64), index, -1)
+    indexes, weights, offsets = _brackets(x, np.atleast_1d(np.asarray(values, dtype=np.float64)), *args, **_fillcurve(*args, **kwargs))
+    y = np.moveaxis(np.sum(np.asarray(header, dtype=np.float64)[indexes] * weights, axis=-1) + offsets, -1, index)
+    return y if np.ndim(values) else np.take(y, 0, axis=index)
+
+def interpolation(narray, header, values, *args, index, plan=None, **kwargs):
+    plan = plan if plan is not None else InterpolationPlan(header, values, *args, **_fillcurve(*args, **kwargs), **kwargs)
+    y = plan(narray, index=index)
+    return y if np.ndim(values) else np.take(y, 0, axis=index)
 
 
 # REDUCTION
 def wtaverage(narray, *args, index, weights, **kwargs): 
-    return np.apply_along_axis(_wtaverage, index, narray, weights)
+    narray, weights = np.asarray(narray, dtype=np.float64), np.asarray(weights, dtype=np.float64)
+    if weights.ndim == 1: 
+        assert len(weights) == narray.shape[index]
+        weights = np.reshape(weights, _replace([1] * narray.ndim, index % narray.ndim, -1))
+    valid = ~np.isnan(narray)
+    weights = np.where(valid, weights, 0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.sum(np.where(valid, narray, 0) * weights, axis=index) / np.sum(weights, axis=index)
+
+def moments(narray, *args, index=None, block=4096, keepdims=False, **kwargs):
+    index = index % narray.ndim if index is not None else None
+    shape = tuple([1 if index is None or i == index else n for i, n in enumerate(narray.shape)])
+    axis = index if index is not None else tuple(range(narray.ndim))
+    index = index if index is not None else 0
+    count, mean, m2 = np.zeros(shape), np.zeros(shape), np.zeros(shape)
+    minimum, maximum = np.full(shape, np.inf), np.full(shape, -np.inf)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for start in range(0, max(narray.shape[index], 1), block):
+            x = narray[_block(narray.ndim, index, start, start + block)].astype(np.float64, copy=False)
+            n = np.sum(~np.isnan(x), axis=axis, keepdims=True)
+            m = np.nansum(x, axis=axis, keepdims=True) / n
+            delta, total = np.nan_to_num(m - mean), count + n
+            m2 = m2 + np.nansum(np.square(x - m), axis=axis, keepdims=True) + np.square(delta) * np.nan_to_num(count * n / total)
+            mean = mean + delta * np.nan_to_num(n / total)
+            minimum, maximum = np.minimum(minimum, np.min(x, axis=axis, keepdims=True, initial=np.inf)), np.maximum(maximum, np.max(x, axis=axis, keepdims=True, initial=-np.inf))
+            count = total
+        mean, variance = np.where(count > 0, mean, np.nan), np.where(count > 0, m2 / count, np.nan)
+    results = (count, mean, variance, minimum, maximum)
+    return results if keepdims else tuple([np.squeeze(result, axis=axis) for result in results])
 
 
 # EXPANSION
@@ -92,6 +184,22 @@ def equalbroadcast(narray, *args, index, values, **kwargs):
     
 
 # ROLLING
+_STATISTICS = {'sum':lambda x, n: _prefixdifference(x, n), 
+               'mean':lambda x, n: _prefixdifference(x, n) / n, 
+               'max':lambda x, n: _blockextrema(np.maximum, x, n, -np.inf), 
+               'min':lambda x, n: _blockextrema(np.minimum, x, n, np.inf), 
+               'range':lambda x, n: _blockextrema(np.maximum, x, n, -np.inf) - _blockextrema(np.minimum, x, n, np.inf)}
+
+def rolling(narray, *args, index, period, statistics=('sum',), **kwargs):
+    assert isinstance(period, int) and period > 0
+    assert narray.shape[index] >= period 
+    assert all([statistic in _STATISTICS.keys() for statistic in statistics])
+    x = np.moveaxis(np.asarray(narray, dtype=np.float64), index, -1)
+    invalid = _prefixdifference(np.isnan(x).astype(np.int64), period) > 0
+    x = np.where(np.isnan(x), 0, x) if np.any(invalid) else x
+    results = {statistic:_STATISTICS[statistic](x, period) for statistic in statistics}
+    return {statistic:np.moveaxis(np.where(invalid, np.nan, result), -1, index) for statistic, result in results.items()}
+
 def cumulate(narray, *args, index, direction, **kwargs):
     function = {'lower': lambda x: np.cumsum(x), 'upper': lambda x: np.flip(np.cumsum(np.flip(x, 0)), 0)}[direction]
     return np.apply_along_axis(function, index, narray)
@@ -102,16 +210,10 @@ def uncumulate(narray, *args, index, direction, **kwargs):
     return np.apply_along_axis(function, index, narray)
 
 def movingaverage(narray, *args, index, period, **kwargs):
-    assert isinstance(period, int)
-    assert narray.shape[index] >= period 
-    function = lambda x: np.convolve(x, np.ones(period)/period, 'valid')   
-    return np.apply_along_axis(function, index, narray)
+    return rolling(narray, *args, index=index, period=period, statistics=('mean',), **kwargs)['mean']
 
 def movingtotal(narray, *args, index, period, **kwargs):
-    assert isinstance(period, int)
-    assert narray.shape[index] >= period 
-    function = lambda x: np.convolve(x, np.ones(period), 'valid')
-    return np.apply_along_axis(function, index, narray)
+    return rolling(narray, *args, index=index, period=period, statistics=('sum',), **kwargs)['sum']
 
 
 
@@ -7,47 +7,231 @@ Created on Sun Feb 23 2020
 """
 
 import numpy as np
-import warnings
+import pandas as pd
+import xarray as xr
 from abc import ABC, abstractmethod
+from collections import OrderedDict as ODict
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+from utilities.dispatchers import type_singledispatcher as type_dispatcher
 
 __version__ = "1.0.0"
 __author__ = "Jack Kirby Cook"
-__all__ = ['UtilityIndex', 'UtilityFunction']
+__all__ = ['UtilityIndex', 'UtilityFunction', 'UtilitySpecification', 'UtilityGraph']
 __copyright__ = "Copyright 2020, Jack Kirby Cook"
 __license__ = ""
 
 
 _aslist = lambda items: [items] if not isinstance(items, (list, tuple)) else list(items)
 _normalize = lambda items: np.array(items) / np.sum(np.array(items))
+_expand = lambda x: np.expand_dims(x, axis=-1)
+_outer = lambda x, y: np.multiply(np.expand_dims(x, axis=-1), np.expand_dims(y, axis=-2))
+_diagonal = lambda x: np.multiply(np.expand_dims(x, axis=-2), np.eye(np.shape(x)[-1]))
+_ces = lambda x, w, p: np.sum(np.multiply(np.power(x, p), w), axis=-1)
+_linear = lambda x, w: np.sum(np.multiply(x, w), axis=-1)
+_weighting = lambda w: np.divide(w, np.sum(w, axis=-1, keepdims=True), out=np.ones(w.shape) / np.shape(w)[-1], where=np.sum(w, axis=-1, keepdims=True) > 0)
+_frozen = lambda items: np.require(np.array(items, dtype=np.float64), requirements=['C', 'O'])
 
 
 UTILITY_FUNCTIONS = {
-    'cobbdouglas': lambda x, w, a, d, *args: (np.prod(np.power(x, w)) ** d) * a,
-    'ces': lambda x, w, a, d, p, *args: (np.sum(np.multiply(np.power(x, p), w)) ** (d/p)) * a,
-    'linear': lambda x, w, a, *args: np.sum(np.multiply(x, w)) ** a,
-    'expcobbdouglas': lambda x, w, a, d, *args: (np.prod(np.power(np.exp(x), w)) ** d) * a}
-UTILITY_DERIVATIVES = {
-    'cobbdouglas': lambda i, x, w, a, d, *args: a * w[i] * d * (1/x[i]) * (np.prod(np.power(x, w)) ** d),
-    'ces': lambda i, x, w, a, d, p, *args: a * w[i] * d * (x[i]**(p-1)) * (np.sum(np.multiply(x, w) ** p) ** ((d/p)-1)),
-    'linear': lambda i, x, w, a, d, *args: a * w[i],
-    'expcobbdouglas': lambda i, x, w, a, d, *args: a * w[i] * d * (np.prod(np.power(np.exp(x), w)) ** d)}
+    'cobbdouglas': lambda x, w, a, d, *args: (np.prod(np.power(x, w), axis=-1) ** d) * a,
+    'ces': lambda x, w, a, d, p, *args: (np.sum(np.multiply(np.power(x, _expand(p)), w), axis=-1) ** (d/p)) * a,
+    'linear': lambda x, w, a, *args: np.sum(np.multiply(x, w), axis=-1) ** a,
+    'expcobbdouglas': lambda x, w, a, d, *args: (np.prod(np.power(np.exp(x), w), axis=-1) ** d) * a}
+UTILITY_GRADIENTS = {
+    'cobbdouglas': lambda x, w, a, d, *args: _expand(UTILITY_FUNCTIONS['cobbdouglas'](x, w, a, d)) * d * np.divide(w, x),
+    'ces': lambda x, w, a, d, p, *args: _expand(_ces(x, w, p) ** ((d/p)-1)) * a * d * np.multiply(w, np.power(x, p-1)),
+    'linear': lambda x, w, a, *args: _expand(_linear(x, w) ** (a-1)) * a * w,
+    'expcobbdouglas': lambda x, w, a, d, *args: _expand(UTILITY_FUNCTIONS['expcobbdouglas'](x, w, a, d)) * d * w}
+UTILITY_HESSIANS = {
+    'cobbdouglas': lambda x, w, a, d, *args: _expand(_expand(UTILITY_FUNCTIONS['cobbdouglas'](x, w, a, d))) * (_outer(d * np.divide(w, x), d * np.divide(w, x)) - _diagonal(d * np.divide(w, np.square(x)))),
+    'ces': lambda x, w, a, d, p, *args: a * d * ((d-p) * _expand(_expand(_ces(x, w, p) ** ((d/p)-2))) * _outer(np.multiply(w, np.power(x, p-1)), np.multiply(w, np.power(x, p-1))) + (p-1) * _expand(_expand(_ces(x, w, p) ** ((d/p)-1))) * _diagonal(np.multiply(w, np.power(x, p-2)))),
+    'linear': lambda x, w, a, *args: _expand(_expand(_linear(x, w) ** (a-2))) * a * (a-1) * _outer(w, w),
+    'expcobbdouglas': lambda x, w, a, d, *args: _expand(_expand(UTILITY_FUNCTIONS['expcobbdouglas'](x, w, a, d))) * (d ** 2) * _outer(w, w)}
 INDEX_FUNCTIONS = {
-    'additive': lambda x, w, t, a: np.sum(np.multiply(np.divide(w, t), x)) * a,
-    'inverted': lambda x, w, t, a: np.sum(np.divide(np.divide(w, t), x)) * a,
-    'tangent': lambda x, w, t, a: np.sum(np.multiply(np.divide(w, t), np.tan(x * np.pi/2))) * a,
-    'rtangent': lambda x, w, t, a: np.sum(np.multiply(np.divide(w, t), np.tan((1 - x) * np.pi/2))) * a,
-    'logarithm': lambda x, w, t, a: np.sum(np.multiply(np.divide(w, t), np.log(x + 1))) * a}
+    'additive': lambda x, w, t, a: np.sum(np.multiply(np.divide(w, t), x), axis=-1) * a,
+    'inverted': lambda x, w, t, a: np.sum(np.divide(np.divide(w, t), x), axis=-1) * a,
+    'tangent': lambda x, w, t, a: np.sum(np.multiply(np.divide(w, t), np.tan(x * np.pi/2)), axis=-1) * a,
+    'rtangent': lambda x, w, t, a: np.sum(np.multiply(np.divide(w, t), np.tan((1 - x) * np.pi/2)), axis=-1) * a,
+    'logarithm': lambda x, w, t, a: np.sum(np.multiply(np.divide(w, t), np.log(x + 1)), axis=-1) * a}
 
 
 class NumericalError(Exception): pass
 
 
+def _utilitysweep(functiontype, x, s, w, c):
+    with np.errstate(all='ignore'): 
+        return UTILITY_FUNCTIONS[functiontype](np.subtract(x, np.expand_dims(s, axis=1)), np.expand_dims(w, axis=1), *[_expand(values) for values in c.T])
+
+def _indexsweep(functiontype, x, t, w, a):
+    with np.errstate(all='ignore'): 
+        return INDEX_FUNCTIONS[functiontype](x, np.expand_dims(w, axis=1), np.expand_dims(t, axis=1), _expand(a))
+
+def _grid(axes, defaults):
+    meshes = np.meshgrid(*[np.asarray(values) for values in axes.values()], indexing='ij')
+    meshes = {key:mesh.flatten() for key, mesh in zip(axes.keys(), meshes)}
+    size = int(np.prod([len(values) for values in axes.values()]))
+    return {key:(meshes[key] if key in meshes.keys() else np.full(size, value, dtype=np.float64)) for key, value in defaults.items()}
+
+def _sweep(worker, functiontype, x, wrapper, axes, arrays, *args, chunksize=None, processes=None, **kwargs):
+    size = int(np.prod([len(values) for values in axes.values()]))
+    template = xr.DataArray(wrapper(np.zeros(x.shape[:-1])))
+    x = x.reshape(-1, x.shape[-1])
+    chunksize = chunksize if chunksize is not None else max(1, 2**22 // max(x.size, 1))
+    chunks = [[values[i:i+chunksize] for values in arrays] for i in range(0, size, chunksize)]
+    if not processes: results = [worker(functiontype, x, *chunk) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as executor: 
+            results = list(executor.map(worker, repeat(functiontype), repeat(x), *zip(*chunks)))
+    values = np.concatenate(results, axis=0).reshape(*[len(values) for values in axes.values()], *template.shape)
+    return xr.DataArray(values, coords={**axes, **template.coords}, dims=[*axes.keys(), *template.dims])
+
+
+@type_dispatcher
+def _tabulate(data, parameters, functions): raise TypeError(type(data).__name__)
+
+@_tabulate.register(np.ndarray)
+def _tabulate_narray(data, parameters, functions):
+    assert data.ndim == 2 and data.shape[-1] == len(parameters)
+    return data, lambda values: values
+
+@_tabulate.register(pd.DataFrame)
+def _tabulate_dataframe(data, parameters, functions):
+    columns = [data[parm].values if parm in data.columns else np.asarray(functions[parm].batch(data, errors='ignore')) for parm in parameters]
+    def wrapper(values): 
+        if np.ndim(values) == 1: return pd.Series(values, index=data.index)
+        else: return pd.DataFrame(values, index=data.index, columns=list(parameters))
+    return np.stack(columns, axis=-1), wrapper
+
+@_tabulate.register(xr.Dataset)
+def _tabulate_dataset(data, parameters, functions):
+    dataarrays = [data[parm] if parm in data.data_vars else functions[parm].batch(data, errors='ignore') for parm in parameters]
+    dataarrays = xr.broadcast(*dataarrays)
+    coords, dims = dataarrays[0].coords, dataarrays[0].dims
+    def wrapper(values): 
+        if np.ndim(values) == len(dims): return xr.DataArray(values, coords=coords, dims=dims)
+        else: return xr.DataArray(values, coords=coords, dims=[*dims, 'parameter']).assign_coords(parameter=list(parameters))
+    return np.stack([dataarray.values for dataarray in dataarrays], axis=-1), wrapper
+
+
+class UtilitySpecification(object):
+    __slots__ = ('functiontype', 'parameters', 'coefficents', 'subsistences', 'weights', 'key')
+
+    def __repr__(self): 
+        string = '{}(functiontype={}, parameters={}, coefficents={}, subsistences={}, weights={})' 
+        return string.format(self.__class__.__name__, self.functiontype, self.parameters, self.coefficents, self.subsistences, self.weights)
+    
+    def __hash__(self): return self.key
+    def __len__(self): return len(self.parameters)
+    def __setattr__(self, attr, value): raise AttributeError(attr)
+    def __delattr__(self, attr): raise AttributeError(attr)
+    def __init__(self, functiontype, parameters, *args, coefficents, subsistences, weights, key, **kwargs):
+        assert functiontype in UTILITY_FUNCTIONS.keys()
+        assert len(parameters) == len(subsistences) == len(weights)
+        items = dict(functiontype=functiontype, parameters=tuple(parameters), key=key)
+        arrays = dict(coefficents=coefficents, subsistences=subsistences, weights=weights)
+        arrays = {attr:_frozen(values) for attr, values in arrays.items()}
+        for values in arrays.values(): values.setflags(write=False)
+        for attr, value in {**items, **arrays}.items(): object.__setattr__(self, attr, value)
+
+    def __call__(self, x): return self.__execute(UTILITY_FUNCTIONS[self.functiontype], x)
+    def derivative(self, i, x): return self.gradient(x)[..., i]
+    def gradient(self, x): return self.__execute(UTILITY_GRADIENTS[self.functiontype], x)
+    def hessian(self, x): return self.__execute(UTILITY_HESSIANS[self.functiontype], x)
+
+    def masked(self, x):
+        z = np.subtract(x, self.subsistences)
+        with np.errstate(all='ignore'): 
+            u = UTILITY_FUNCTIONS[self.functiontype](z, self.weights, *self.coefficents)
+            diagnostics = np.logical_or(np.logical_not(np.isfinite(z)), np.less(z, 0))
+        return u, np.isfinite(u), diagnostics
+
+    def __execute(self, function, x):
+        z = np.subtract(x, self.subsistences)
+        with np.errstate(all='ignore'): values = function(z, self.weights, *self.coefficents)
+        if not np.all(np.isfinite(values)): raise NumericalError(z)
+        return values
+
+
+class UtilityGraph(object):
+    def __init__(self, function):
+        nodes = ODict()
+        def visit(node):
+            if node.key in nodes.keys(): return
+            for child in node.functions.values(): visit(child)
+            nodes[node.key] = node
+        visit(function)
+        self.__root = function.key
+        self.__nodes = nodes
+        self.__leaves = tuple([(key, parm) for key, node in nodes.items() for parm in node.parameters if parm not in node.functions.keys()])
+        self.__edges = {key:{parm:(node.functions[parm].key if parm in node.functions.keys() else self.__leaves.index((key, parm))) for parm in node.parameters} for key, node in nodes.items()}
+
+    @property
+    def nodes(self): return self.__nodes
+    @property
+    def leaves(self): return self.__leaves
+    @property
+    def root(self): return self.__nodes[self.__root]
+    
+    def __repr__(self): return '{}(root={}, nodes={}, leaves={})'.format(self.__class__.__name__, self.root.name, len(self.__nodes), len(self.__leaves))
+    def __len__(self): return len(self.__leaves)
+    def __call__(self, *args, **kwargs): 
+        values = self.forward(*args, **kwargs)
+        return values[self.__root][1]
+
+    def gradient(self, *args, **kwargs):
+        u, du, ddu = self.differentiate(self.forward(*args, **kwargs), order=1)
+        return du
+
+    def hessian(self, *args, **kwargs):
+        u, du, ddu = self.differentiate(self.forward(*args, **kwargs), order=2)
+        return ddu
+
+    def forward(self, *args, **kwargs):
+        values = ODict()
+        for key, node in self.__nodes.items():
+            nested = {parm:values[edge][1] for parm, edge in self.__edges[key].items() if edge in values.keys()}
+            x = node.execute(*args, **nested, **kwargs)
+            x = np.array([x[parm] for parm in node.parameters])
+            values[key] = (x, node.compile()(x))
+        return values
+
+    def evaluate(self, x, errors='raise'):
+        assert np.shape(x)[-1] == len(self.__leaves)
+        assert errors in ('raise', 'ignore')
+        function = lambda node, inputs: node.compile()(inputs) if errors == 'raise' else node.compile().masked(inputs)[0]
+        values = ODict()
+        for key, node in self.__nodes.items():
+            inputs = np.stack([values[edge][1] if edge in values.keys() else x[..., edge] for edge in self.__edges[key].values()], axis=-1)
+            values[key] = (inputs, function(node, inputs))
+        return values
+
+    def differentiate(self, values, order=1):
+        gradients = {key:self.__nodes[key].compile().gradient(x) for key, (x, u) in values.items()}
+        adjoints = {key:np.zeros(np.shape(u)) for key, (x, u) in values.items()}
+        adjoints[self.__root] = np.ones(np.shape(values[self.__root][1]))
+        du = np.zeros((*np.shape(values[self.__root][1]), len(self.__leaves)))
+        for key in reversed(self.__nodes.keys()):
+            for i, edge in enumerate(self.__edges[key].values()):
+                if edge in adjoints.keys(): adjoints[edge] = adjoints[edge] + adjoints[key] * gradients[key][..., i]
+                else: du[..., edge] = du[..., edge] + adjoints[key] * gradients[key][..., i]
+        if order < 2: return values[self.__root][1], du, None
+        identity, jacobians, totals = np.eye(len(self.__leaves)), {}, {}
+        for key in self.__nodes.keys():
+            jacobians[key] = np.stack([totals[edge] if edge in totals.keys() else np.broadcast_to(identity[edge], du.shape) for edge in self.__edges[key].values()], axis=-2)
+            totals[key] = np.einsum('...i,...il->...l', gradients[key], jacobians[key])
+        hessians = {key:self.__nodes[key].compile().hessian(x) for key, (x, u) in values.items()}
+        ddu = sum([np.expand_dims(adjoints[key], axis=(-1, -2)) * np.einsum('...il,...ij,...jm->...lm', jacobians[key], hessians[key], jacobians[key]) for key in self.__nodes.keys()])
+        return values[self.__root][1], du, ddu
+
+
 class UtilityIndex(ABC): 
     def __init_subclass__(cls, *args, functionname, functiontype, parameters=[], coefficents=[], **kwargs):
-        assert isinstance(functionname, str) and isinstance(functiontype=str)
+        assert isinstance(functionname, str) and isinstance(functiontype, str)
         assert isinstance(parameters, (tuple, list)) and isinstance(coefficents, (tuple, list))
         assert functiontype in INDEX_FUNCTIONS.keys()
-        setattr(cls, 'funcitonname', functionname)
+        setattr(cls, 'functionname', functionname)
         setattr(cls, 'functiontype', functiontype)
         setattr(cls, 'parameters', tuple(sorted(parameters)))
         setattr(cls, 'coefficents', tuple(coefficents))      
@@ -60,7 +244,7 @@ class UtilityIndex(ABC):
 
     @property
     def key(self): 
-        items = [(parameter, self.tolerances[parameter], self.weight[parameter]) for parameter in self.parameters] 
+        items = [(parameter, self.tolerances[parameter], self.weights[parameter]) for parameter in self.parameters] 
         return hash((self.functionname, self.functiontype, self.amplitude, tuple(items),))
     
     def __repr__(self): 
@@ -70,7 +254,7 @@ class UtilityIndex(ABC):
     def __len__(self): return len(self.parameters)
     def __init__(self, *args, amplitude=1, tolerances={}, weights={}, **kwargs): 
         assert isinstance(tolerances, dict) and isinstance(weights, dict)
-        assert all([hasattr(self, attr) for attr in ('functionname', 'functiontype', 'function', 'parameters')])
+        assert all([hasattr(self, attr) for attr in ('functionname', 'functiontype', 'parameters')])
         self.amplitude = amplitude
         self.tolerances = {parm:tolerances.get(parm, 1) for parm in self.parameters}
         self.weights = {parm:weights.get(parm, 0) for parm in self.parameters}
@@ -79,19 +263,49 @@ class UtilityIndex(ABC):
         v = self.execute(*args, **kwargs)
         assert isinstance(v, dict)
         assert all([parm in v.keys() for parm in self.parameters])
+        t, w = self.vectors()
+        x = np.array([v[parm] for parm in self.parameters])
+        return INDEX_FUNCTIONS[self.functiontype](x, w, t, self.amplitude)  
+
+    def vectors(self):
         t = np.array([self.tolerances[parm] for parm in self.parameters])
         w = np.array([self.weights[parm] for parm in self.parameters])
         w = _normalize(w) if sum(w) > 0 else np.ones(w.shape) * (1/len(w))
-        x = np.array([v[parm] for parm in self.parameters])
-        return INDEX_FUNCTIONS[self.functiontype](x, w, t, self.amplitude)  
+        return t, w
+
+    def batch(self, data, errors='ignore'):
+        assert errors in ('raise', 'ignore', 'mask')
+        x, wrapper = _tabulate(data, self.parameters, {})
+        t, w = self.vectors()
+        with np.errstate(all='ignore'): 
+            u = INDEX_FUNCTIONS[self.functiontype](x, w, t, self.amplitude)
+            terms = INDEX_FUNCTIONS[self.functiontype](_expand(x), _expand(w), _expand(t), self.amplitude)
+            mask, diagnostics = np.isfinite(u), np.logical_not(np.isfinite(terms))
+        if errors == 'mask': return wrapper(u), wrapper(mask), wrapper(diagnostics)
+        if errors == 'raise' and not np.all(mask): raise NumericalError(x[np.logical_not(mask)])
+        return wrapper(u)
+
+    def sweep(self, data, *args, amplitude=None, tolerances={}, weights={}, chunksize=None, processes=None, **kwargs):
+        assert set(tolerances.keys()) <= set(self.parameters) and set(weights.keys()) <= set(self.parameters)
+        x, wrapper = _tabulate(data, self.parameters, {})
+        axes = ODict([('amplitude', amplitude)] if amplitude is not None else [])
+        axes.update(ODict([('{}_tolerance'.format(parm), tolerances[parm]) for parm in self.parameters if parm in tolerances.keys()]))
+        axes.update(ODict([('{}_weight'.format(parm), weights[parm]) for parm in self.parameters if parm in weights.keys()]))
+        defaults = {'amplitude':self.amplitude}
+        defaults.update({'{}_tolerance'.format(parm):self.tolerances[parm] for parm in self.parameters})
+        defaults.update({'{}_weight'.format(parm):self.weights[parm] for parm in self.parameters})
+        grid = _grid(axes, defaults)
+        t = np.stack([grid['{}_tolerance'.format(parm)] for parm in self.parameters], axis=-1)
+        w = _weighting(np.stack([grid['{}_weight'.format(parm)] for parm in self.parameters], axis=-1))
+        return _sweep(_indexsweep, self.functiontype, x, wrapper, axes, [t, w, grid['amplitude']], chunksize=chunksize, processes=processes)
 
     
 class UtilityFunction(ABC): 
     def __init_subclass__(cls, functionname, functiontype, *args, parameters=[], coefficents=[], **kwargs):
-        assert isinstance(functionname, str) and isinstance(functiontype=str)
+        assert isinstance(functionname, str) and isinstance(functiontype, str)
         assert isinstance(parameters, (tuple, list)) and isinstance(coefficents, (tuple, list))
         assert functiontype in UTILITY_FUNCTIONS.keys()
-        setattr(cls, 'funcitonname', functionname)
+        setattr(cls, 'functionname', functionname)
         setattr(cls, 'functiontype', functiontype)
         setattr(cls, 'parameters', tuple(sorted(parameters)))
         setattr(cls, 'coefficents', tuple(coefficents))            
@@ -102,12 +316,11 @@ class UtilityFunction(ABC):
     def execute(self, *args, **kwargs): return {}
 
     @property
-    def key(self): 
-        types = (self.name, self.functiontype)
-        coefficents = [(key, value) for key, value in self.__coefficents.items()]
-        items = [(parm, self.__subsistences[parm], self.__weights[parm]) for parm in self.parameters]   
-        functions = [(parm, self.__functions[parm].key if parm in self.__functions.keys() else None) for parm in self.parameters]
-        return hash((tuple(types), tuple(coefficents), tuple(items), tuple(functions)))
+    def key(self): return self.compile().key
+    @property
+    def functions(self): return dict(self.__functions)
+    @property
+    def leaves(self): return self.graph().leaves
     
     def __repr__(self): 
         string = '{}(name={}, functiontype={}, coefficents={}, subsistences={}, weights={})' 
@@ -121,41 +334,61 @@ class UtilityFunction(ABC):
         self.__weights = {parm:weights.get(parm, 0) for parm in self.parameters}
         self.__functions = {parm:functions[parm] for parm in self.parameters if parm in functions}        
         self.__coefficents = {coefficent:kwargs[coefficent] for coefficent in self.coefficents}         
-        
-    def __call__(self, *args, **kwargs):
-        nestedkwargs = {parm:func(*args, **kwargs) for parm, func in self.__functions.items()}
-        x = self.execute(*args, **nestedkwargs, **kwargs)
-        x = np.array([x[parm] for parm in self.parameters])                
-        c = [self.__coefficents[coefficent] for coefficent in self.coefficents]
-        s = np.array([self.__subsistences[parm] for parm in self.parameters])
-        w = np.array([self.__weights[parm] for parm in self.parameters])
-        w = _normalize(w) if sum(w) > 0 else np.ones(w.shape) * (1/len(w))
-        with warnings.catch_warnings():
-            warnings.filterwarnings('error')
-            try: u = UTILITY_FUNCTIONS[self.functiontype](np.subtract(x, s), w, *c)
-            except Warning: raise NumericalError(np.subtract(x, s))
-        return u
+        self.__specification = None
+        self.__graph = None
 
-    def derivative(self, filtration, *args, **kwargs):
-        filtration = _aslist(filtration)
-        nestedkwargs = {parm:func(*args, **kwargs) for parm, func in self.__functions.items()}
-        i = self.parameters.index(filtration[0])
-        x = self.execute(*args, **nestedkwargs, **kwargs)
-        x = np.array([x[parm] for parm in self.parameters])                        
+    def graph(self):
+        if self.__graph is None: self.__graph = UtilityGraph(self)
+        return self.__graph
+
+    def compile(self):
+        if self.__specification is not None: return self.__specification
+        types = (self.name, self.functiontype)
+        coefficents = [(key, value) for key, value in self.__coefficents.items()]
+        items = [(parm, self.__subsistences[parm], self.__weights[parm]) for parm in self.parameters]   
+        functions = [(parm, self.__functions[parm].key if parm in self.__functions.keys() else None) for parm in self.parameters]
+        key = hash((tuple(types), tuple(coefficents), tuple(items), tuple(functions)))
         c = [self.__coefficents[coefficent] for coefficent in self.coefficents]
         s = np.array([self.__subsistences[parm] for parm in self.parameters])
         w = np.array([self.__weights[parm] for parm in self.parameters])
-        w = _normalize(w) if sum(w) > 0 else np.ones(w.shape) * (1/len(w)) 
-        with warnings.catch_warnings():
-            warnings.filterwarnings('error')
-            try: du = UTILITY_DERIVATIVES[self.functiontype](i, np.subtract(x, s), w, *c)
-            except Warning: raise NumericalError(np.subtract(x, s))
-        dx = self.__functions[filtration[0]].derivative(filtration[1:], *args, **kwargs) if len(filtration) > 1 else 1       
-        return du * dx
-
+        w = _normalize(w) if sum(w) > 0 else np.ones(w.shape) * (1/len(w))
+        self.__specification = UtilitySpecification(self.functiontype, self.parameters, coefficents=c, subsistences=s, weights=w, key=key)
+        return self.__specification
+        
+    def __call__(self, *args, **kwargs): return self.graph()(*args, **kwargs)
 
+    def sweep(self, data, *args, subsistences={}, weights={}, chunksize=None, processes=None, **coefficents):
+        assert set(coefficents.keys()) <= set(self.coefficents)
+        assert set(subsistences.keys()) <= set(self.parameters) and set(weights.keys()) <= set(self.parameters)
+        x, wrapper = _tabulate(data, self.parameters, self.__functions)
+        axes = ODict([(coefficent, coefficents[coefficent]) for coefficent in self.coefficents if coefficent in coefficents.keys()])
+        axes.update(ODict([('{}_subsistence'.format(parm), subsistences[parm]) for parm in self.parameters if parm in subsistences.keys()]))
+        axes.update(ODict([('{}_weight'.format(parm), weights[parm]) for parm in self.parameters if parm in weights.keys()]))
+        defaults = {coefficent:self.__coefficents[coefficent] for coefficent in self.coefficents}
+        defaults.update({'{}_subsistence'.format(parm):self.__subsistences[parm] for parm in self.parameters})
+        defaults.update({'{}_weight'.format(parm):self.__weights[parm] for parm in self.parameters})
+        grid = _grid(axes, defaults)
+        s = np.stack([grid['{}_subsistence'.format(parm)] for parm in self.parameters], axis=-1)
+        w = _weighting(np.stack([grid['{}_weight'.format(parm)] for parm in self.parameters], axis=-1))
+        c = np.stack([grid[coefficent] for coefficent in self.coefficents], axis=-1)
+        return _sweep(_utilitysweep, self.functiontype, x, wrapper, axes, [s, w, c], chunksize=chunksize, processes=processes)
 
+    def batch(self, data, errors='raise'):
+        assert errors in ('raise', 'ignore', 'mask')
+        x, wrapper = _tabulate(data, self.parameters, self.__functions)
+        u, mask, diagnostics = self.compile().masked(x)
+        if errors == 'mask': return wrapper(u), wrapper(mask), wrapper(diagnostics)
+        if errors == 'raise' and not np.all(mask): raise NumericalError(np.subtract(x, self.compile().subsistences)[np.logical_not(mask)])
+        return wrapper(u)
 
+    def derivative(self, filtration, *args, **kwargs):
+        values = self.graph().forward(*args, **kwargs)
+        du, function = 1, self
+        for parm in _aslist(filtration):
+            x, u = values[function.key]
+            du = du * function.compile().derivative(function.parameters.index(parm), x)
+            function = function.functions.get(parm, None)
+        return du
 
-        
-        
\ No newline at end of file
+    def gradient(self, *args, **kwargs): return self.graph().gradient(*args, **kwargs)
+    def hessian(self, *args, **kwargs): return self.graph().hessian(*args, **kwargs)
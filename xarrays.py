@@ -6,6 +6,9 @@ Created on Sat Aug 11 2018
 
 """
 
+import os
+import pickle
+import hashlib
 import numpy as np
 import pandas as pd
 import xarray as xr
@@ -22,32 +25,73 @@ __copyright__ = "Copyright 2018, Jack Kirby Cook"
 __license__ = ""
 
 
-_AGGREGATIONS = {'sum':np.sum, 'avg':np.mean, 'max':np.max, 'min':np.min}
+_REDUCTIONS = {'sum':lambda x, i, n: np.add.reduceat(x, i, axis=-1), 
+               'avg':lambda x, i, n: np.add.reduceat(x, i, axis=-1) / n, 
+               'max':lambda x, i, n: np.maximum.reduceat(x, i, axis=-1), 
+               'min':lambda x, i, n: np.minimum.reduceat(x, i, axis=-1)}
+_PARALLELIZED = {'dask':'parallelized', 'dask_gufunc_kwargs':{'allow_rechunk':True}}
 
 _aslist = lambda items: [items] if not isinstance(items, (list, tuple)) else list(items)
 _flatten = lambda nesteditems: [item for items in nesteditems for item in items]
-_forceframe = lambda table: table.to_frame() if not isinstance(table, pd.DataFrame) else table
+_unpack = lambda items: items[0] if len(items) == 1 else items
 
 
 # FACTORY 
-def xarray_fromdataframe(dataframe, *args, datakeys, attrs={}, aggs={}, forcedataset=True, **kwargs):
+_SCATTERS = {'sum':lambda i, x, n: np.bincount(i, weights=x, minlength=n), 
+             'avg':lambda i, x, n: np.bincount(i, weights=x, minlength=n) / np.bincount(i, minlength=n), 
+             'max':lambda i, x, n: _scatterat(np.maximum, i, x, n, -np.inf), 
+             'min':lambda i, x, n: _scatterat(np.minimum, i, x, n, np.inf)}
+
+def _scatterat(ufunc, indexes, values, size, initial):
+    scattered = np.full(size, initial, dtype=np.float64)
+    ufunc.at(scattered, indexes, values)
+    return scattered
+
+def _scatter(cells, values, size, agg=None):
+    if agg is None:
+        if len(cells) != size: raise ValueError('cannot scatter a non-unique index without an aggregation')
+        scattered = np.empty(size, dtype=values.dtype)
+        scattered[cells] = values
+        return scattered
+    valid = ~pd.isnull(values)
+    scattered = _SCATTERS[agg](cells[valid], values[valid].astype(np.float64), size)
+    return scattered if agg == 'sum' else np.where(np.bincount(cells[valid], minlength=size) > 0, scattered, np.nan)
+
+def _column(series):
+    if isinstance(series.dtype, pd.api.extensions.ExtensionDtype) and pd.api.types.is_numeric_dtype(series.dtype) and series.isna().any(): return series.to_numpy(dtype=np.float64, na_value=np.nan)
+    return series.to_numpy()
+
+def _fillable(dtype): 
+    if np.issubdtype(dtype, np.inexact) or dtype == object: return dtype
+    return np.dtype(np.float64) if np.issubdtype(dtype, np.number) else np.dtype(object)
+
+def _densify(indexes, values, shape):
+    size = int(np.prod(shape))
+    dense = np.empty(size, dtype=values.dtype) if len(indexes) == size else np.full(size, np.nan, dtype=_fillable(values.dtype))
+    dense[indexes] = values
+    return dense.reshape(shape)
+
+def _sparsify(indexes, values, shape):
+    import sparse
+    return sparse.COO(np.unravel_index(indexes, shape), values.astype(_fillable(values.dtype)), shape=shape, fill_value=np.nan)
+
+def xarray_fromdataframe(dataframe, *args, datakeys, attrs={}, aggs={}, forcedataset=True, sparse=False, **kwargs):
     assert all([key in dataframe.columns for key in datakeys])
-    
     axeskeys = [key for key in dataframe.columns if key not in datakeys]
-    axeskeys.sort(key=lambda key: len(set(dataframe[key].values)))
-
-    dataframe = dataframe.set_index(axeskeys, drop=True)[datakeys[0] if len(datakeys) == 1 else list(datakeys)] 
-    dataframe = _forceframe(dataframe)
-    aggs = {key:_AGGREGATIONS[aggkey] for key, aggkey in aggs.items() if key in datakeys}
-    if aggs: dataframe = dataframe.groupby(axeskeys).agg(aggs, axis=1)
+    factorized = {key:pd.factorize(dataframe[key].values, sort=True) for key in axeskeys}
+    axeskeys.sort(key=lambda key: len(factorized[key][1]))
+    rows = np.all([factorized[key][0] >= 0 for key in axeskeys], axis=0)
+    
+    shape = tuple([len(factorized[key][1]) for key in axeskeys])
+    coords = ODict([(key, pd.Index(factorized[key][1], name=key)) for key in axeskeys])
+    cells, indexes = pd.factorize(np.ravel_multi_index([factorized[key][0][rows] for key in axeskeys], shape))
+    datakeys = [key for key in datakeys if key in aggs.keys()] if aggs else list(datakeys)
+    if not datakeys: raise ValueError(dataframe.columns)
     
-    if len(dataframe.columns) == 1:
-        dataarray = xr.DataArray.from_series(dataframe.squeeze()) 
-        dataarray.name = datakeys[0]
-        xarray = dataarray if not forcedataset else xr.Dataset({datakeys[0]:dataarray})
-    elif len(dataframe.columns) > 1: 
-        xarray =  xr.Dataset.from_dataframe(dataframe)
-    else: raise ValueError(dataframe.columns)         
+    function = _sparsify if sparse else _densify
+    values = {key:function(indexes, _scatter(cells, _column(dataframe[key])[rows], len(indexes), aggs.get(key, None)), shape) for key in datakeys}
+    dataarrays = ODict([(key, xr.DataArray(values[key], coords=coords, dims=axeskeys, name=key)) for key in datakeys])
+    xarray = dataarrays[datakeys[0]] if len(dataarrays) == 1 and not forcedataset else xr.Dataset(dataarrays)
     xarray.attrs = attrs
     return xarray
     
@@ -65,8 +109,9 @@ def xarray_fromvalues(data, *args, axes, scope={}, attrs={}, forcedataset=True,
 
 # SUPPORT
 def dataarray_function(function):
-    def wrapper(dataarray, *args, **kwargs):
+    def wrapper(dataarray, *args, chunks=None, **kwargs):
         assert isinstance(dataarray, xr.DataArray)
+        if chunks is not None: dataarray = dataarray.chunk(chunks)
         newdataarray = function(dataarray, *args, **kwargs)
         newdataarray.attrs = dataarray.attrs
         newdataarray.name = dataarray.name
@@ -74,6 +119,134 @@ def dataarray_function(function):
     update_wrapper(wrapper, function)
     return wrapper
 
+def _digest(hasher, item):
+    if isinstance(item, xr.DataArray): 
+        for content in (item.values, item.dims, ODict([(key, coord.values) for key, coord in item.coords.items()]), item.attrs, item.name): _digest(hasher, content)
+    elif isinstance(item, nar.InterpolationPlan):
+        for content in ('plan', item.header, item.values, item.how, item.indexes, item.weights, item.offsets): _digest(hasher, content)
+    elif isinstance(item, (pd.Series, pd.DataFrame)):
+        for content in (type(item).__name__, repr(item.dtypes.tolist() if isinstance(item, pd.DataFrame) else item.dtype), item.to_numpy(), item.index, item.columns if isinstance(item, pd.DataFrame) else item.name): _digest(hasher, content)
+    elif isinstance(item, pd.Index):
+        for content in ('index', repr(item.dtype), item.to_numpy(), list(item.names)): _digest(hasher, content)
+    elif isinstance(item, np.ndarray):
+        hasher.update(repr((item.dtype.str, item.shape)).encode())
+        if item.dtype != object: hasher.update(np.ascontiguousarray(item).tobytes())
+        else: _digest(hasher, item.tolist())
+    elif isinstance(item, dict):
+        hasher.update(b'dict')
+        for key, value in item.items(): _digest(hasher, key); _digest(hasher, value)
+    elif isinstance(item, (list, tuple)):
+        hasher.update(type(item).__name__.encode())
+        for value in item: _digest(hasher, value)
+    elif isinstance(item, (str, bytes, int, float, complex, type(None), np.generic)): hasher.update(repr((type(item).__name__, item)).encode())
+    else: raise TypeError(type(item).__name__)
+
+class DataArrayCache(object):
+    def __init__(self, directory, *args, budget=2**30, **kwargs):
+        os.makedirs(directory, exist_ok=True)
+        self.__directory, self.__budget = directory, budget
+        self.__hits, self.__misses, self.__bypasses = 0, 0, 0
+
+    def __repr__(self): return '{}(directory={}, budget={}, entries={}, hits={}, misses={})'.format(self.__class__.__name__, self.__directory, self.__budget, len(self), self.__hits, self.__misses)
+    def __len__(self): return len(self.entries)
+    def __contains__(self, key): return os.path.exists(self.__path(key, 'npy'))
+    def __call__(self, function):
+        def wrapper(dataarray, *args, **kwargs):
+            if isinstance(dataarray, xr.DataArray) and dataarray.chunks is not None: return function(dataarray, *args, **kwargs)
+            try: key = self.key(function, dataarray, *args, **kwargs)
+            except TypeError: 
+                self.__bypasses += 1
+                return function(dataarray, *args, **kwargs)
+            try: newdataarray = self.__load(key)
+            except FileNotFoundError: pass
+            else: 
+                self.__hits += 1
+                return newdataarray
+            self.__misses += 1
+            newdataarray = function(dataarray, *args, **kwargs)
+            self.__store(key, newdataarray)
+            self.__evict()
+            return newdataarray
+        update_wrapper(wrapper, function)
+        return wrapper
+
+    @property
+    def directory(self): return self.__directory
+    @property
+    def budget(self): return self.__budget
+    @property
+    def hits(self): return self.__hits
+    @property
+    def misses(self): return self.__misses
+    @property
+    def bypasses(self): return self.__bypasses
+    @property
+    def entries(self): return [filename[:-4] for filename in os.listdir(self.__directory) if filename.endswith('.npy')]
+    @property
+    def size(self): return sum([self.__size(key) for key in self.entries])
+
+    def key(self, function, dataarray, *args, **kwargs):
+        hasher = hashlib.blake2b(digest_size=20)
+        _digest(hasher, '.'.join([function.__module__, function.__qualname__]))
+        for item in (dataarray, args, ODict(sorted(kwargs.items()))): _digest(hasher, item)
+        return hasher.hexdigest()
+
+    def clear(self):
+        for key in self.entries: self.__remove(key)
+        self.__hits, self.__misses, self.__bypasses = 0, 0, 0
+
+    def __path(self, key, extension): return os.path.join(self.__directory, '.'.join([key, extension]))
+    def __size(self, key): return sum([os.path.getsize(self.__path(key, extension)) for extension in ('npy', 'pkl') if os.path.exists(self.__path(key, extension))])
+    def __remove(self, key):
+        for extension in ('npy', 'pkl'): 
+            if os.path.exists(self.__path(key, extension)): os.remove(self.__path(key, extension))
+
+    def __load(self, key):
+        values = np.load(self.__path(key, 'npy'), allow_pickle=True)
+        with open(self.__path(key, 'pkl'), 'rb') as file: metadata = pickle.load(file)
+        os.utime(self.__path(key, 'npy'))
+        if metadata is None: return values
+        coords = ODict([(name, (dims, coord)) for name, (dims, coord) in metadata['coords'].items()])
+        return xr.DataArray(values, coords=coords, dims=metadata['dims'], name=metadata['name'], attrs=metadata['attrs'])
+
+    def __store(self, key, newdataarray):
+        values = newdataarray.values if isinstance(newdataarray, xr.DataArray) else np.asarray(newdataarray)
+        metadata = {'dims':newdataarray.dims, 'coords':ODict([(name, (coord.dims, coord.values)) for name, coord in newdataarray.coords.items()]), 'name':newdataarray.name, 'attrs':newdataarray.attrs} if isinstance(newdataarray, xr.DataArray) else None
+        with open(self.__path(key, 'pkl.tmp'), 'wb') as file: pickle.dump(metadata, file, protocol=pickle.HIGHEST_PROTOCOL)
+        with open(self.__path(key, 'npy.tmp'), 'wb') as file: np.save(file, values, allow_pickle=values.dtype == object)
+        os.replace(self.__path(key, 'pkl.tmp'), self.__path(key, 'pkl'))
+        os.replace(self.__path(key, 'npy.tmp'), self.__path(key, 'npy'))
+
+    def __evict(self):
+        entries = sorted(self.entries, key=lambda key: os.path.getmtime(self.__path(key, 'npy')))
+        sizes = [self.__size(key) for key in entries]
+        while entries and sum(sizes) > self.__budget:
+            self.__remove(entries.pop(0))
+            sizes.pop(0)
+
+
+def compute(xarray, *args, workers=None, **kwargs):
+    assert isinstance(xarray, (xr.DataArray, xr.Dataset))
+    return xarray.compute(scheduler='threads', num_workers=workers)
+
+_trim = lambda dataarray, axis, window: dataarray[{axis:slice(window // 2, len(dataarray.coords[axis]) - (window - 1) // 2)}]
+
+def _cumulate(values, position):
+    if np.issubdtype(values.dtype, np.inexact): np.copyto(values, 0, where=np.isnan(values))
+    return np.cumsum(values, axis=position, out=values)
+
+def _normalize(values, position): 
+    count, mean, variance, xmin, xmax = nar.moments(values, index=position, keepdims=True)
+    return np.divide(values, np.where(count > 0, count * mean, 0), out=values)
+
+def _standardize(values, position):
+    count, mean, variance, xmin, xmax = nar.moments(values, index=position, keepdims=True)
+    return np.divide(np.subtract(values, mean, out=values), np.sqrt(variance), out=values)
+
+def _minmax(values, position):
+    count, mean, variance, xmin, xmax = nar.moments(values, index=position, keepdims=True)
+    return np.divide(np.subtract(values, xmin, out=values), np.subtract(xmax, xmin), out=values)
+
 @keyword_dispatcher('fill')
 def _fillcurve(*args, **kwargs): return {'bounds_error':True}
 @_fillcurve.register('extrapolate')
@@ -91,60 +264,89 @@ def average(dataarray, *args, axis, **kwargs): return dataarray.mean(dim=axis, k
 def stdev(dataarray, *args, axis, **kwargs): return dataarray.std(dim=axis, keep_attrs=True) 
 
 @dataarray_function
-def minimum(dataarray, *args, axis, **kwargs): return xr.apply_ufunc(np.amin, dataarray, input_core_dims=[[axis]], keep_attrs=True, kwargs={'axis':-1})    
+def minimum(dataarray, *args, axis, **kwargs): return xr.apply_ufunc(np.amin, dataarray, input_core_dims=[[axis]], keep_attrs=True, kwargs={'axis':-1}, output_dtypes=[dataarray.dtype], **_PARALLELIZED)    
 @dataarray_function
-def maximum(dataarray, *args, axis, **kwargs): return xr.apply_ufunc(np.amax, dataarray, input_core_dims=[[axis]], keep_attrs=True, kwargs={'axis':-1})    
+def maximum(dataarray, *args, axis, **kwargs): return xr.apply_ufunc(np.amax, dataarray, input_core_dims=[[axis]], keep_attrs=True, kwargs={'axis':-1}, output_dtypes=[dataarray.dtype], **_PARALLELIZED)    
 
 @dataarray_function
 def wtaverage(dataarray, *args, axis, weights, **kwargs): 
-    function = lambda x: nar.wtaverage(x, index=-1, weights=weights)
-    return xr.apply_ufunc(function, dataarray, input_core_dims=[[axis]], keep_attrs=True)  
+    weights = weights if isinstance(weights, xr.DataArray) else xr.DataArray(np.asarray(weights, dtype=np.float64), dims=[axis])
+    weights = weights.where(dataarray.notnull(), 0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return (dataarray.fillna(0) * weights).sum(dim=axis) / weights.sum(dim=axis)
+
+def _lazymoments(dataarray, axis):
+    xmoments = (dataarray.count(dim=axis), dataarray.mean(dim=axis), dataarray.var(dim=axis), dataarray.min(dim=axis, skipna=False), dataarray.max(dim=axis, skipna=False))
+    return ODict([(key, xmoment.astype(np.float64)) for key, xmoment in zip(('count', 'mean', 'variance', 'minimum', 'maximum'), xmoments)])
+
+def moments(dataarray, *args, axis=None, **kwargs):
+    assert isinstance(dataarray, xr.DataArray)
+    if dataarray.chunks is not None: return xr.Dataset(_lazymoments(dataarray, axis), attrs=dataarray.attrs)
+    dims = list(dataarray.dims) if axis is None else [axis]
+    function = lambda x: nar.moments(x, index=None if axis is None else -1)
+    xmoments = xr.apply_ufunc(function, dataarray, input_core_dims=[dims], output_core_dims=[[]]*5, output_dtypes=[np.float64]*5, **_PARALLELIZED)
+    return xr.Dataset({key:xmoment for key, xmoment in zip(('count', 'mean', 'variance', 'minimum', 'maximum'), xmoments)}, attrs=dataarray.attrs)
 
 
 # GROUPING
 @dataarray_function
 def groupby(dataarray, *args, axis, agg, axisgroups={}, **kwargs):
     if all([key == value[0] and len(value) == 1 for key, value in axisgroups.items()]): return dataarray
-    dataarrays = [dataarray.loc[{axis:_aslist(values)}] for values in axisgroups.values()] 
-    newdataarrays = []
-    for dataarray, newvalue in zip(dataarrays, axisgroups.keys()):
-        newdataarray = xr.apply_ufunc(_AGGREGATIONS[agg], dataarray, input_core_dims=[[axis]], keep_attrs=True, kwargs={'axis':-1})
-        try: newdataarray = newdataarray.assign_coords(**{axis:newvalue}).expand_dims(axis) 
-        except:        
-            newdataarray = newdataarray.assign_coords(**{axis:str(newvalue)}).expand_dims(axis)
-            newdataarray.coords[axis] = pd.Index([newvalue], name=axis) 
-        newdataarrays.append(newdataarray)
-    return xr.concat(newdataarrays, axis)
+    members = [_aslist(values) for values in axisgroups.values()]
+    assert all([len(values) > 0 for values in members])
+    indexes = dataarray.get_index(axis).get_indexer(_flatten(members))
+    if np.any(indexes < 0): raise KeyError(np.array(_flatten(members), dtype=object)[indexes < 0])
+    counts = np.array([len(values) for values in members])
+    offsets = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    function = lambda x: _REDUCTIONS[agg](np.take(x, indexes, axis=-1), offsets, counts)
+    parallelized = dict(dask_gufunc_kwargs={'allow_rechunk':True, 'output_sizes':{axis:len(members)}}, dask='parallelized', output_dtypes=[np.result_type(dataarray.dtype, np.float64) if agg == 'avg' else dataarray.dtype])
+    newdataarray = xr.apply_ufunc(function, dataarray.drop_vars([key for key, coord in dataarray.coords.items() if axis in coord.dims]), input_core_dims=[[axis]], output_core_dims=[[axis]], exclude_dims={axis}, keep_attrs=True, **parallelized)
+    newdataarray = newdataarray.assign_coords({axis:pd.Index(list(axisgroups.keys()), name=axis, tupleize_cols=False)})
+    return newdataarray.transpose(axis, ...)
 
 
 # BROADCASTING
+_LAZYTRANSFORMS = {_normalize: lambda x, m: x / xr.where(m['count'] > 0, m['count'] * m['mean'], 0), 
+                   _standardize: lambda x, m: (x - m['mean']) / np.sqrt(m['variance']), 
+                   _minmax: lambda x, m: (x - m['minimum']) / (m['maximum'] - m['minimum'])}
+
+def _transform(kernel, dataarray, axis, inplace=False):
+    assert not inplace or (dataarray.chunks is None and np.issubdtype(dataarray.dtype, np.inexact))
+    if dataarray.chunks is not None: return _LAZYTRANSFORMS[kernel](dataarray, _lazymoments(dataarray, axis)).transpose(*dataarray.dims)
+    dims = list(dataarray.dims) if axis is None else [axis]
+    dtype = np.result_type(dataarray.dtype, np.float64)
+    function = lambda x: kernel(x if inplace else x.astype(dtype), None if axis is None else -1)
+    newdataarray = xr.apply_ufunc(function, dataarray, input_core_dims=[dims], output_core_dims=[dims], keep_attrs=True, output_dtypes=[dtype], **_PARALLELIZED)
+    return dataarray if inplace else newdataarray.transpose(*dataarray.dims)
+
 @dataarray_function
-def normalize(dataarray, *args, axis=None, **kwargs):
-    xtotal = summation(dataarray, *args, axis=axis, **kwargs)
-    function = lambda x, t: np.divide(x, t)
-    return xr.apply_ufunc(function, dataarray, xtotal, keep_attrs=True)
+def normalize(dataarray, *args, axis=None, inplace=False, **kwargs):
+    return _transform(_normalize, dataarray, axis, inplace=inplace)
 
 @dataarray_function
-def standardize(dataarray, *args, axis=None, **kwargs):
-    xmean = average(dataarray, *args, axis=axis, **kwargs)
-    xstd = stdev(dataarray, *args, axis=axis, **kwargs)
-    function = lambda x, m, s: np.divide(np.subtract(x, m), s)
-    return xr.apply_ufunc(function, dataarray, xmean, xstd, keep_attrs=True)
+def standardize(dataarray, *args, axis=None, inplace=False, **kwargs):
+    return _transform(_standardize, dataarray, axis, inplace=inplace)
 
 @dataarray_function
-def minmax(dataarray, *args, axis=None, **kwargs):
-    xmin = kwargs.get('minimum', minimum(dataarray, *args, axis=axis, **kwargs))
-    xmax = kwargs.get('maximum', maximum(dataarray, *args, axis=axis, **kwargs))
+def minmax(dataarray, *args, axis=None, inplace=False, **kwargs):
+    if 'minimum' not in kwargs and 'maximum' not in kwargs: return _transform(_minmax, dataarray, axis, inplace=inplace)
+    xmin = kwargs.get('minimum', None) if 'minimum' in kwargs else minimum(dataarray, *args, axis=axis)
+    xmax = kwargs.get('maximum', None) if 'maximum' in kwargs else maximum(dataarray, *args, axis=axis)
     function = lambda x, mi, ma: np.divide(np.subtract(x, mi), np.subtract(ma, mi))
-    return xr.apply_ufunc(function, dataarray, xmin, xmax, keep_attrs=True) 
+    return xr.apply_ufunc(function, dataarray, xmin, xmax, keep_attrs=True, dask='parallelized')
 
 @dataarray_function
 def absolute(dataarary, *args, **kwargs):
-    return xr.apply_ufunc(np.abs, dataarary, keep_attrs=True)
+    return xr.apply_ufunc(np.abs, dataarary, keep_attrs=True, dask='parallelized')
 
 @dataarray_function
-def interpolate(dataarray, *args, values, axis, how, **kwargs):
-    return dataarray.interp(**{axis:values}, method=how, kwargs=_fillcurve(*args, **kwargs)) 
+def interpolate(dataarray, *args, values, axis, how, plan=None, **kwargs):
+    plan = plan if plan is not None else nar.InterpolationPlan(dataarray.coords[axis].values, values, *args, how=how, **_fillcurve(*args, **kwargs))
+    function = lambda y: plan(y, index=-1)
+    parallelized = dict(dask_gufunc_kwargs={'allow_rechunk':True, 'output_sizes':{axis:len(plan)}}, dask='parallelized', output_dtypes=[np.float64])
+    newdataarray = xr.apply_ufunc(function, dataarray.drop_vars([key for key, coord in dataarray.coords.items() if axis in coord.dims]), input_core_dims=[[axis]], output_core_dims=[[axis]], exclude_dims={axis}, keep_attrs=True, **parallelized)
+    newdataarray = newdataarray.assign_coords({axis:np.atleast_1d(values)}).transpose(*dataarray.dims)
+    return newdataarray if np.ndim(values) else newdataarray.isel({axis:0})
 
 
 # ROLLING
@@ -167,31 +369,62 @@ def lower_uncumulate(dataarray, *args, axis,  total, **kwargs):
     residdataarray = residdataarray.assign_coords({axis:dataarray.coords[axis].values[0]})
     return xr.concat([residdataarray, diffdataarray], dim=axis, data_vars='all')         
 
+def moving_statistics(dataarray, *args, axis, period, statistics=('mean',), **kwargs):
+    assert isinstance(dataarray, xr.DataArray) and isinstance(period, int)
+    assert len(dataarray.coords[axis].values) >= period
+    window, size = period + 1, len(dataarray.coords[axis].values)
+    function = lambda x: _unpack(tuple(nar.rolling(x, index=-1, period=window, statistics=statistics).values()))
+    parallelized = dict(dask_gufunc_kwargs={'allow_rechunk':True, 'output_sizes':{axis:size - window + 1}}, dask='parallelized', output_dtypes=[np.float64]*len(statistics))
+    results = xr.apply_ufunc(function, dataarray, input_core_dims=[[axis]], output_core_dims=[[axis]]*len(statistics), exclude_dims={axis}, **parallelized)
+    template = _trim(dataarray, axis, window)
+    results = [template.copy(data=result.transpose(*dataarray.dims).data) for result in _aslist(results)]
+    return xr.Dataset({statistic:result for statistic, result in zip(statistics, results)}, attrs=dataarray.attrs)
+
 @dataarray_function
 def moving_average(dataarray, *args, axis, period, **kwargs):
-    assert isinstance(period, int)
-    assert len(dataarray.coords[axis].values) >= period
-    newdataarray = dataarray.rolling(**{axis:period+1}, center=True).mean().dropna(axis, how='all')
-    return newdataarray
+    return moving_statistics(dataarray, *args, axis=axis, period=period, statistics=('mean',))['mean']
 
 @dataarray_function
 def moving_summation(dataarray, *args, axis, period, **kwargs):
-    assert isinstance(period, int)
-    assert len(dataarray.coords[axis].values) >= period
-    newdataarray = dataarray.rolling(**{axis:period+1}, center=True).sum().dropna(axis, how='all')
-    return newdataarray
+    return moving_statistics(dataarray, *args, axis=axis, period=period, statistics=('sum',))['sum']
 
 @dataarray_function
 def moving_difference(dataarray, *args, axis, period, **kwargs):
-    assert isinstance(period, int)
-    assert len(dataarray.coords[axis].values) >= period
-    maxdataarray = dataarray.rolling(**{axis:period+1}, center=True).max().dropna(axis, how='all')
-    mindataarray = dataarray.rolling(**{axis:period+1}, center=True).min().dropna(axis, how='all')
-    return maxdataarray - mindataarray
-
-
-
+    return moving_statistics(dataarray, *args, axis=axis, period=period, statistics=('range',))['range']
 
 
+# PIPELINE
+_INPLACE = {'normalize':_normalize, 'standardize':_standardize, 'minmax':_minmax, 
+            'absolute':lambda values, position: np.abs(values, out=values), 
+            'lower_cumulate':_cumulate, 
+            'upper_cumulate':lambda values, position: _cumulate(np.flip(values, axis=position), position)}
+_FLOATING = ('normalize', 'standardize', 'minmax')
+_PIPELINE = {function.__name__:function for function in (summation, average, stdev, minimum, maximum, wtaverage, groupby, normalize, standardize, minmax, absolute, interpolate, 
+                                                         upper_cumulate, lower_cumulate, upper_uncumulate, lower_uncumulate, moving_average, moving_summation, moving_difference)}
 
 
+class Pipeline(object):
+    def __init__(self, *stages): self.__stages = list(stages)
+    def __repr__(self): return '{}({})'.format(self.__class__.__name__, ', '.join([name for name, args, kwargs in self.__stages]))
+    def __len__(self): return len(self.__stages)
+    
+    def __getattr__(self, name):
+        if name.startswith('_') or name not in _PIPELINE.keys(): raise AttributeError(name)
+        return lambda *args, **kwargs: self.__class__(*self.__stages, (name, args, kwargs))
+    
+    def __call__(self, dataarray, *args, chunks=None, **kwargs):
+        assert isinstance(dataarray, xr.DataArray)
+        if chunks is not None: dataarray = dataarray.chunk(chunks)
+        newdataarray, owned = dataarray, False
+        for name, stageargs, stagekwargs in self.__stages:
+            if dataarray.chunks is not None or name not in _INPLACE.keys() or not set(stagekwargs.keys()) <= {'axis'}:
+                newdataarray = _PIPELINE[name].__wrapped__(newdataarray, *stageargs, **stagekwargs)
+                owned = dataarray.chunks is None and not np.may_share_memory(newdataarray.values, dataarray.values)
+                continue
+            if name in _FLOATING and not np.issubdtype(newdataarray.dtype, np.inexact): newdataarray, owned = newdataarray.astype(np.float64), True
+            if not owned: newdataarray, owned = newdataarray.copy(deep=True), True
+            axis = stagekwargs.get('axis', None)
+            _INPLACE[name](newdataarray.values, newdataarray.get_axis_num(axis) if axis is not None else None)
+        newdataarray.attrs = dataarray.attrs
+        newdataarray.name = dataarray.name
+        return newdataarray